@@ -0,0 +1,279 @@
+#!/usr/bin/python3
+
+# Run the CRIS import against a local database, such as the `postgis` service of the docker compose stack,
+# without 1Password, the SFTP endpoint, the bastion host or S3, and report how fast each stage ran.
+#
+# The import is run for real, so point it at a database you don't mind changing.
+
+import os
+import shutil
+import argparse
+import tempfile
+
+import cris_import
+import lib.instrumentation as instrumentation
+from lib.diffreport import FORMATS as DIFF_REPORT_FORMATS
+from lib.synthetic import write_synthetic_extract
+from lib.testing import mess_with_incoming_records_to_ensure_updates
+
+
+def main(args):
+    secrets = local_secrets(args)
+    cris_import.configure(secrets)
+
+    report = instrumentation.RunReport()
+    instrumentation.slow_query_ms = args.slow_query_ms
+
+    work_directory = tempfile.mkdtemp()
+    try:
+        with cris_import.open_database() as db:
+            if args.extract and args.extract.endswith(".zip"):
+                shutil.copy(args.extract, work_directory)
+                with report.stage("unzip_archives") as metrics:
+                    extracted_archives = cris_import.unzip_archives(work_directory)
+                    metrics["archives"] = len(extracted_archives)
+                    metrics["bytes"] = cris_import.directory_size(work_directory)
+            elif args.extract:
+                extracted_archives = [args.extract]
+            else:
+                with report.stage(
+                    "write_synthetic_extract"
+                ) as metrics, db.connection() as pg:
+                    metrics["planned"] = write_synthetic_extract(
+                        pg,
+                        work_directory,
+                        args.crashes,
+                        overlap_fraction=args.overlap_fraction,
+                        update_fraction=args.update_fraction,
+                        conflict_fraction=args.conflict_fraction,
+                        malformed_fraction=args.malformed_fraction,
+                        groups=args.groups,
+                        seed=args.seed,
+                    )
+                extracted_archives = [work_directory]
+
+            if args.dry_run:
+                os.makedirs(args.dry_run_report, exist_ok=True)
+
+            logical_groups = []
+            for archive in extracted_archives:
+                logical_groups += cris_import.group_csvs_into_logical_groups(
+                    archive,
+                    dry_run=args.dry_run,
+                    per_record=args.per_record,
+                    loader=args.loader,
+                    batch_size=args.batch_size,
+                    itersize=args.itersize,
+                    replace_children=args.replace_children,
+                    diff_report_directory=args.dry_run_report,
+                    diff_report_format=args.dry_run_format,
+                )
+            logical_groups.sort(key=cris_import.logical_group_order)
+
+            imported_groups = []
+            if args.workers > 1:
+                imported_groups = list(
+                    cris_import.import_logical_groups_in_parallel(
+                        logical_groups, args.workers, secrets, args.slow_query_ms, db
+                    )
+                )
+            else:
+                for logical_group in logical_groups:
+                    typed_token = cris_import.load_logical_group(logical_group, db)
+                    if args.force_updates:
+                        typed_token = mess_with_incoming_records_to_ensure_updates(
+                            typed_token, db
+                        )
+                    align_records_token = cris_import.align_records(typed_token, db)
+                    imported_groups.append(
+                        cris_import.clean_up_import_schema(align_records_token, db)
+                    )
+
+            queued_cr3_count = cris_import.invalidate_cr3s(imported_groups, db)
+    finally:
+        shutil.rmtree(work_directory)
+
+    cris_import.print_run_summary(imported_groups, queued_cr3_count)
+    report.add_logical_groups(imported_groups)
+    report.totals["cr3s_queued"] = queued_cr3_count
+    report.print_query_summary()
+    print_throughput(report)
+    report.write(args.report)
+    if args.metrics_file:
+        report.append_to_metrics_file(args.metrics_file)
+
+
+def local_secrets(args):
+    """
+    Stand-ins for the secrets held in 1Password, enough to run the import against a local database
+
+    Arguments:
+        args: The parsed command line arguments
+
+    Returns: A dictionary of secrets, as returned by cris_import.get_secrets()
+    """
+
+    secrets = {
+        secret: None
+        for secret in [
+            "SFTP_endpoint",
+            "sftp_endpoint_private_key",
+            "bastion_host",
+            "bastion_ssh_username",
+            "bastion_ssh_private_key",
+            "aws_access_key",
+            "aws_secret_key",
+            "s3_archive_bucket_name",
+            "s3_archive_path",
+        ]
+    }
+    secrets.update(
+        {
+            "archive_extract_password": args.zip_password,
+            "database_host": args.db_host,
+            "database_port": args.db_port,
+            "database_username": args.db_user,
+            "database_password": args.db_password,
+            "database_name": args.db_name,
+            "database_ssl_policy": "disable",
+            "graphql_endpoint": args.graphql_endpoint,
+            "graphql_endpoint_key": args.graphql_endpoint_key,
+        }
+    )
+    return secrets
+
+
+def add_synthetic_extract_arguments(parser):
+    parser.add_argument(
+        "--crashes",
+        type=int,
+        default=10000,
+        help="Number of crashes in the synthetic extract",
+    )
+    parser.add_argument(
+        "--overlap-fraction",
+        type=float,
+        default=0.9,
+        help="Fraction of the synthetic crashes which already exist in the database. The rest are new.",
+    )
+    parser.add_argument(
+        "--update-fraction",
+        type=float,
+        default=0.2,
+        help="Fraction of the synthetic crashes which change an unprotected column",
+    )
+    parser.add_argument(
+        "--conflict-fraction",
+        type=float,
+        default=0.02,
+        help="Fraction of the synthetic crashes which change a protected column as well",
+    )
+    parser.add_argument(
+        "--malformed-fraction",
+        type=float,
+        default=0.0,
+        help="Fraction of the synthetic records which are repeated with a blank key column",
+    )
+    parser.add_argument(
+        "--groups",
+        type=int,
+        default=1,
+        help="Number of logical groups to spread the synthetic crashes across",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="Seed for the choices made by the synthetic extract"
+    )
+
+
+def add_database_arguments(parser):
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-port", type=int, default=5432)
+    parser.add_argument("--db-user", default=os.getenv("POSTGRES_USER", "visionzero"))
+    parser.add_argument(
+        "--db-password", default=os.getenv("POSTGRES_PASSWORD", "visionzero")
+    )
+    parser.add_argument("--db-name", default=os.getenv("POSTGRES_DB", "atd_vz_data"))
+
+
+def print_throughput(report):
+    """
+    Print the wall time and rows per second of each stage, summed over the logical groups of the run
+
+    Arguments:
+        report: The RunReport of the run
+
+    Returns: None
+    """
+
+    stages = {name: dict(metrics) for name, metrics in report.stages.items()}
+    for logical_group in report.logical_groups:
+        for name, metrics in logical_group["stages"].items():
+            totals = stages.setdefault(name, {"seconds": 0, "rows": 0})
+            totals["seconds"] = totals.get("seconds", 0) + metrics["seconds"]
+            totals["rows"] = totals.get("rows", 0) + metrics.get("rows", 0)
+
+    print("Throughput by stage:")
+    for name, metrics in stages.items():
+        line = f"  {name}: {metrics['seconds']:.2f} s"
+        if metrics.get("rows"):
+            line += f", {metrics['rows']} rows, {metrics['rows'] / max(metrics['seconds'], 0.001):.0f} rows/s"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CRIS import against a local database"
+    )
+    parser.add_argument(
+        "--extract",
+        help="A CRIS zip archive, or a directory of extracted CSVs, to import. Without it a synthetic extract is written.",
+    )
+    parser.add_argument("--zip-password", help="Password of the zip archive")
+    add_synthetic_extract_arguments(parser)
+    parser.add_argument(
+        "--force-updates",
+        action="store_true",
+        help="Change every imported record before it is aligned, as lib/testing.py does. Not used with --workers.",
+    )
+    add_database_arguments(parser)
+    parser.add_argument(
+        "--graphql-endpoint",
+        default="http://localhost:8084/v1/graphql",
+        help="Hasura endpoint which conflicts are sent to",
+    )
+    parser.add_argument("--graphql-endpoint-key", default="")
+    parser.add_argument(
+        "--per-record",
+        action="store_true",
+        help="Reconcile imported records one at a time instead of with set-based queries",
+    )
+    parser.add_argument(
+        "--replace-children",
+        action="store_true",
+        help="Replace the units and people of crashes nobody has edited in bulk",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Leave the database as it is, and write what the import would do to a report",
+    )
+    parser.add_argument("--dry-run-report", default="cris_import_dry_run")
+    parser.add_argument("--dry-run-format", choices=DIFF_REPORT_FORMATS, default="csv")
+    parser.add_argument(
+        "--loader",
+        choices=["pgloader", "copy"],
+        default="copy",
+        help="Load the CSVs with pgloader, or stream them with COPY FROM STDIN",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--itersize", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--slow-query-ms", type=float, default=1000)
+    parser.add_argument("--report", default="cris_import_benchmark.json")
+    parser.add_argument(
+        "--metrics-file",
+        help="A JSON lines file to append the report to, for comparing runs over time",
+    )
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+# Write a synthetic CRIS extract, built from the crashes already in a local database, to load test the
+# import with. The CSVs can be imported with `benchmark.py --extract`, or packed into a password protected
+# zip archive like the ones CRIS delivers.
+
+import os
+import argparse
+
+from lib.database import DatabaseConnectionManager
+from lib.synthetic import write_synthetic_extract, pack_extract
+from benchmark import add_synthetic_extract_arguments, add_database_arguments
+
+
+def main(args):
+    os.makedirs(args.output_directory, exist_ok=True)
+
+    with DatabaseConnectionManager(
+        None,
+        None,
+        None,
+        args.db_host,
+        args.db_user,
+        args.db_password,
+        args.db_name,
+        "disable",
+        port=args.db_port,
+    ) as db:
+        with db.connection() as pg:
+            write_synthetic_extract(
+                pg,
+                args.output_directory,
+                args.crashes,
+                overlap_fraction=args.overlap_fraction,
+                update_fraction=args.update_fraction,
+                conflict_fraction=args.conflict_fraction,
+                malformed_fraction=args.malformed_fraction,
+                groups=args.groups,
+                seed=args.seed,
+            )
+
+    if args.archive:
+        pack_extract(args.output_directory, args.archive, args.zip_password)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic CRIS extract for load testing the import"
+    )
+    parser.add_argument(
+        "--output-directory",
+        required=True,
+        help="Directory to write the CSVs of the extract into",
+    )
+    add_synthetic_extract_arguments(parser)
+    parser.add_argument(
+        "--archive",
+        help="Also pack the CSVs into this zip archive, encrypted with --zip-password. Requires 7-Zip.",
+    )
+    parser.add_argument("--zip-password", default="", help="Password of the archive")
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    main(args)
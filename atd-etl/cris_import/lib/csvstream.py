@@ -0,0 +1,51 @@
+import csv
+import io
+import itertools
+
+
+class TrimmedCsvStream:
+    """
+    A file-like object which COPY FROM STDIN can read a CRIS extract from. The CSV is parsed and re-written a chunk
+    of rows at a time, so memory use doesn't grow with the size of the file, and the trailing carriage returns and
+    newlines CRIS leaves on values are stripped on the way through.
+    """
+
+    def __init__(self, file, rows_per_chunk=1000):
+        self.reader = csv.reader(file)
+        self.header = [column.rstrip("\r\n") for column in next(self.reader)]
+        self.rows_per_chunk = rows_per_chunk
+        self.rows = 0
+        self.chunk = ""
+        self.position = 0
+        self.exhausted = False
+
+    def read(self, size=-1):
+        pieces = []
+        while size < 0 or size > 0:
+            if self.position >= len(self.chunk):
+                if not self.fill():
+                    break
+            end = len(self.chunk) if size < 0 else self.position + size
+            piece = self.chunk[self.position : end]
+            self.position += len(piece)
+            if size > 0:
+                size -= len(piece)
+            pieces.append(piece)
+        return "".join(pieces)
+
+    def fill(self):
+        if self.exhausted:
+            return False
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        rows = 0
+        for row in itertools.islice(self.reader, self.rows_per_chunk):
+            writer.writerow([value.rstrip("\r\n") for value in row])
+            rows += 1
+        if rows == 0:
+            self.exhausted = True
+            return False
+        self.rows += rows
+        self.chunk = output.getvalue()
+        self.position = 0
+        return True
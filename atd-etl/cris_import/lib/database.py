@@ -0,0 +1,139 @@
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.pool
+from sshtunnel import SSHTunnelForwarder
+
+from .sshkeytempdir import SshKeyTempDir, write_key_to_file
+from .instrumentation import CountingConnection
+
+
+class TimedConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    A psycopg2 connection pool which logs how long it takes to open each connection
+    """
+
+    def _connect(self, key=None):
+        started = time.perf_counter()
+        connection = super()._connect(key)
+        print(
+            f"Opened database connection in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return connection
+
+
+class DatabaseConnectionManager:
+    """
+    Opens one SSH tunnel through the bastion host and a small pool of database connections through it,
+    to be shared by every stage of a CRIS import run. Use it as a context manager so the pool and the
+    tunnel are closed when the run is over, whether or not it succeeded.
+
+    Without a bastion host, no tunnel is opened and the connections are made to the database host
+    directly, as when benchmarking against the local development database.
+
+    with DatabaseConnectionManager(...) as db:
+        with db.connection() as pg:
+            ...
+    """
+
+    def __init__(
+        self,
+        ssh_private_key,
+        bastion_host,
+        bastion_ssh_username,
+        rds_host,
+        user,
+        password,
+        dbname,
+        sslmode,
+        max_connections=4,
+        port=5432,
+    ):
+        self.ssh_private_key = ssh_private_key
+        self.bastion_host = bastion_host
+        self.bastion_ssh_username = bastion_ssh_username
+        self.rds_host = rds_host
+        self.user = user
+        self.password = password
+        self.dbname = dbname
+        self.sslmode = sslmode
+        self.max_connections = max_connections
+        self.port = port
+        self.ssh_tunnel = None
+        self.pool = None
+
+    def __enter__(self):
+        if self.bastion_host:
+            self.open_ssh_tunnel()
+            host, port = "localhost", self.ssh_tunnel.local_bind_port
+        else:
+            host, port = self.rds_host, self.port
+
+        try:
+            self.pool = TimedConnectionPool(
+                1,
+                self.max_connections,
+                host=host,
+                port=port,
+                user=self.user,
+                password=self.password,
+                dbname=self.dbname,
+                sslmode=self.sslmode,
+                sslrootcert="/root/rds-combined-ca-bundle.pem",
+                connection_factory=CountingConnection,
+            )
+        except Exception:
+            if self.ssh_tunnel:
+                self.ssh_tunnel.stop()
+            raise
+        return self
+
+    def open_ssh_tunnel(self):
+        # the key is only needed while the tunnel is being opened
+        with SshKeyTempDir() as key_directory:
+            write_key_to_file(
+                key_directory + "/id_ed25519", self.ssh_private_key + "\n"
+            )
+            started = time.perf_counter()
+            self.ssh_tunnel = SSHTunnelForwarder(
+                (self.bastion_host),
+                ssh_username=self.bastion_ssh_username,
+                ssh_private_key=f"{key_directory}/id_ed25519",
+                remote_bind_address=(self.rds_host, self.port),
+            )
+            self.ssh_tunnel.start()
+            print(
+                f"Opened SSH tunnel through {self.bastion_host} in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.pool:
+            self.pool.closeall()
+        if self.ssh_tunnel:
+            self.ssh_tunnel.stop()
+            print("Closed database connections and SSH tunnel")
+        else:
+            print("Closed database connections")
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection from the pool. Anything left uncommitted when the block ends is rolled back,
+        so the next stage to borrow the connection starts with a clean transaction.
+        """
+        pg = self.pool.getconn()
+        try:
+            yield pg
+        finally:
+            if not pg.closed:
+                pg.rollback()
+            self.pool.putconn(pg)
+
+    def connection_string(self):
+        # See https://github.com/dimitri/pgloader/issues/768#issuecomment-693390290
+        if self.ssh_tunnel:
+            host, port = "localhost", self.ssh_tunnel.local_bind_port
+        else:
+            host, port = self.rds_host, self.port
+        return f"postgresql://{self.user}:{self.password}@{host}:{port}/{self.dbname}?sslmode=allow"
@@ -0,0 +1,106 @@
+import csv
+import json
+
+# Parquet reports are optional, as pyarrow isn't needed for anything else
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# the formats reports can be written in here
+FORMATS = ["csv"] + (["parquet"] if pyarrow else [])
+
+COLUMNS = [
+    "table",
+    "crash_id",
+    "key",
+    "outcome",
+    "changed_columns",
+    "important_changed_columns",
+]
+
+
+class DiffReport:
+    """
+    The report of a dry run: one row for every imported record, with the VZDB table it's bound for, its key, and
+    what the import would do with it. That's `insert`, `update` along with the columns which changed, `conflict`
+    along with the protected columns which changed as well, `skip` for records which are unchanged, or `replace` for
+    the records of crashes which are replaced as a whole. Rows are held in memory a chunk at a time and written out
+    as each chunk fills, so a report of any size is written in bounded memory.
+    """
+
+    def __init__(self, path, format="csv", chunk_size=10000):
+        if format == "parquet" and pyarrow is None:
+            raise RuntimeError("Parquet reports need pyarrow, which isn't installed")
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.rows = 0
+        self.file = None
+        self.writer = None
+
+    def __enter__(self):
+        if self.format == "parquet":
+            schema = pyarrow.schema(
+                [
+                    (
+                        column,
+                        pyarrow.int64() if column == "crash_id" else pyarrow.string(),
+                    )
+                    for column in COLUMNS
+                ]
+            )
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, schema)
+        else:
+            self.file = open(self.path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(COLUMNS)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        if self.format == "parquet":
+            self.writer.close()
+        else:
+            self.file.close()
+        print(f"Wrote {self.rows} records to the dry run report {self.path}")
+
+    def write(
+        self,
+        table,
+        record,
+        key_columns,
+        outcome,
+        changed_columns=(),
+        important_changed_columns=(),
+    ):
+        self.chunk.append(
+            [
+                table,
+                record["crash_id"],
+                json.dumps({key: record[key] for key in key_columns}, default=str),
+                outcome,
+                ",".join(changed_columns),
+                ",".join(important_changed_columns),
+            ]
+        )
+        self.rows += 1
+        if len(self.chunk) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.chunk:
+            return
+        if self.format == "parquet":
+            columns = list(zip(*self.chunk))
+            self.writer.write_table(
+                pyarrow.table(
+                    {column: list(values) for column, values in zip(COLUMNS, columns)},
+                    schema=self.writer.schema,
+                )
+            )
+        else:
+            self.writer.writerows(self.chunk)
+        self.chunk = []
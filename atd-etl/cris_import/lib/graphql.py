@@ -4,11 +4,12 @@ import requests
 # 🙏🏻 https://github.com/cityofaustin/atd-moped/blob/main/moped-toolbox/amd_milestones_backfill/utils.py#L18
 
 
-def make_hasura_request(*, query, variables={}, endpoint, admin_secret):
+def make_hasura_request(*, query, variables={}, endpoint, admin_secret, session=None):
     print("Endpoint: ", endpoint)
     headers = {"X-Hasura-Admin-Secret": admin_secret}
     payload = {"query": query, "variables": variables}
-    res = requests.post(endpoint, json=payload, headers=headers)
+    # a requests.Session reuses its connection to Hasura across requests
+    res = (session or requests).post(endpoint, json=payload, headers=headers)
     res.raise_for_status()
     data = res.json()
     try:
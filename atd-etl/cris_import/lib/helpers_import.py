@@ -1,5 +1,5 @@
 """
-This function is borrowed from https://raw.githubusercontent.com/cityofaustin/atd-vz-data/master/atd-etl/app/process/helpers_import.py.
+This function is adapted from https://raw.githubusercontent.com/cityofaustin/atd-vz-data/master/atd-etl/app/process/helpers_import.py.
 
 In our prefect repo, this was made available by a submodule, but I'm going to avoid that here and just bring it in manually
 because we will no longer need this function when the LDM goes into service.
@@ -9,15 +9,40 @@ import json
 import datetime
 
 
-def insert_crash_change_template(new_record_dict, differences, crash_id):
+INSERT_CRASH_CHANGES_MUTATION = """
+    mutation insertCrashChangesMutation($objects: [atd_txdot_changes_insert_input!]!) {
+      insert_atd_txdot_changes(
+        objects: $objects,
+        on_conflict: {
+          constraint: atd_txdot_changes_unique,
+          update_columns: [
+            record_id,
+            record_json,
+            record_type,
+            affected_columns,
+            status_id,
+            updated_by
+            crash_date
+          ]
+        }
+      ) {
+        affected_rows
+      }
+    }
+"""
+
+
+def crash_change_record(new_record_dict, differences, crash_id):
     """
-    Generates a crash insertion graphql query
+    Generates a crash change record, to be inserted with INSERT_CRASH_CHANGES_MUTATION
     :param new_record_dict: dict - The new record as a dictionary
     :param differences
-    :param str crash_id
-    :return: string
+    :param int crash_id
+    :return: dict
     """
 
+    new_record_dict = dict(new_record_dict)
+
     new_record_crash_date = None
     try:
         new_record_crash_date = new_record_dict["crash_date"].strftime(
@@ -36,48 +61,15 @@ def insert_crash_change_template(new_record_dict, differences, crash_id):
         if key == "rpt_sec_speed_limit":
             new_record_dict[key] = int(new_record_dict[key])
 
-    # Turn the dictionary into a character-escaped json string
-    new_record_escaped = json.dumps(json.dumps(new_record_dict), default=str)
-    # Build the template and inject required values
-    output = (
-        """
-        mutation insertCrashChangeMutation {
-          insert_atd_txdot_changes(
-            objects: {
-              record_id: %NEW_RECORD_ID%,
-              record_json: %NEW_RECORD_ESCAPED_JSON%,
-              record_uqid: %NEW_UNIQUE_ID%
-              record_type: "crash",
-              affected_columns: %AFFECTED_COLUMNS%,
-              status_id: 0,
-              updated_by: "System",
-              crash_date: %NEW_RECORD_CRASH_DATE%
-            },
-            on_conflict: {
-              constraint: atd_txdot_changes_unique,
-              update_columns: [
-                record_id,
-                record_json,
-                record_type,
-                affected_columns,
-                status_id,
-                updated_by
-                crash_date
-              ]
-            }
-          ) {
-            affected_rows
-          }
-        }
-        """.replace(
-            "%NEW_RECORD_ESCAPED_JSON%", new_record_escaped
-        )
-        .replace("%NEW_RECORD_ID%", crash_id)
-        .replace("%NEW_UNIQUE_ID%", crash_id)
-        .replace("%AFFECTED_COLUMNS%", json.dumps(json.dumps(differences), default=str))
-        .replace(
-            "%NEW_RECORD_CRASH_DATE%",
-            "null" if new_record_crash_date is None else f'"{new_record_crash_date}"',
-        )
-    )
-    return output
+    # The record and the list of affected columns are stored as JSON strings, as they were when
+    # they were spliced into the mutation as escaped string literals
+    return {
+        "record_id": int(crash_id),
+        "record_json": json.dumps(new_record_dict, default=str),
+        "record_uqid": int(crash_id),
+        "record_type": "crash",
+        "affected_columns": json.dumps(differences),
+        "status_id": 0,
+        "updated_by": "System",
+        "crash_date": new_record_crash_date,
+    }
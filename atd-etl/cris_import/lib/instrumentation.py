@@ -0,0 +1,278 @@
+import datetime
+import json
+import math
+import os
+import re
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+
+import psycopg2.extensions
+import psycopg2.sql
+
+# The number of queries this process has sent to the database. Stages run one at a time in each process, so the
+# difference between two readings is the number of queries issued by the stage which ran in between.
+query_count = 0
+
+# The duration, in milliseconds, of every query this process has sent, by the helper which sent it
+query_timings = {}
+
+# Queries which took at least this many milliseconds are logged with their SQL. None disables the log.
+slow_query_ms = None
+slow_queries = []
+
+SQL_HELPERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql.py")
+
+_counting_cursor_classes = {}
+
+
+def counting_cursor_class(cursor_factory):
+    """
+    A subclass of a psycopg2 cursor class which times the queries it executes and adds them to the counts of the
+    process, attributed to the helper which executed them
+    """
+
+    if cursor_factory not in _counting_cursor_classes:
+
+        class CountingCursor(cursor_factory):
+            def execute(self, query, vars=None):
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    record_query(self, query, started, sys._getframe(1))
+
+            def executemany(self, query, vars_list):
+                started = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    record_query(self, query, started, sys._getframe(1))
+
+            def copy_expert(self, sql, file, size=8192):
+                started = time.perf_counter()
+                try:
+                    return super().copy_expert(sql, file, size)
+                finally:
+                    record_query(self, sql, started, sys._getframe(1))
+
+        _counting_cursor_classes[cursor_factory] = CountingCursor
+
+    return _counting_cursor_classes[cursor_factory]
+
+
+def record_query(cursor, query, started, frame):
+    global query_count
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    helper = calling_helper(frame)
+
+    query_count += 1
+    query_timings.setdefault(helper, array("d")).append(elapsed_ms)
+
+    if slow_query_ms is not None and elapsed_ms >= slow_query_ms:
+        shape = sql_shape(cursor, query)
+        slow_queries.append(
+            {"helper": helper, "ms": round(elapsed_ms, 1), "sql": shape}
+        )
+        print(f"Slow query in {helper} ({elapsed_ms:.0f} ms): {shape[:1000]}")
+
+
+def calling_helper(frame):
+    """
+    The name of the function in lib/sql.py which was called to run a query. Helpers call each other, and
+    the prepared statements and batches, so the outermost of the lib/sql.py functions on the stack is the
+    one named. Queries run from anywhere else are named after the function which ran them.
+    """
+
+    helper = frame.f_code.co_name
+    while frame is not None and frame.f_code.co_filename == SQL_HELPERS_PATH:
+        helper = frame.f_code.co_name
+        frame = frame.f_back
+    return helper
+
+
+def sql_shape(cursor, query):
+    """
+    The SQL of a query with its string and numeric literals replaced by `?` and its whitespace collapsed, so
+    queries which differ only by their values look the same, and no record data ends up in the logs
+    """
+
+    if isinstance(query, psycopg2.sql.Composable):
+        query = query.as_string(cursor)
+    if isinstance(query, bytes):
+        query = query.decode()
+    query = re.sub(r"'(?:[^']|'')*'", "?", query)
+    query = re.sub(r"\b\d+(?:\.\d+)?\b", "?", query)
+    return " ".join(query.split())
+
+
+def take_query_stats():
+    """
+    Hand over the query timings and slow queries recorded by this process so far, and start afresh. Worker
+    processes send them back to the main process with the map state of the logical group they worked on.
+    """
+
+    global query_timings, slow_queries
+    stats = {"timings": query_timings, "slow_queries": slow_queries}
+    query_timings = {}
+    slow_queries = []
+    return stats
+
+
+def merge_query_stats(stats, more_stats):
+    for helper, timings in more_stats["timings"].items():
+        stats["timings"].setdefault(helper, array("d")).extend(timings)
+    stats["slow_queries"] += more_stats["slow_queries"]
+    return stats
+
+
+def summarize_query_timings(timings):
+    """
+    The number of queries, and their cumulative, 95th percentile and longest duration in milliseconds, for each
+    helper, the most time consuming first
+    """
+
+    summary = {}
+    for helper, durations in timings.items():
+        ordered = sorted(durations)
+        summary[helper] = {
+            "queries": len(ordered),
+            "total_ms": round(sum(ordered), 1),
+            "p95_ms": round(ordered[math.ceil(len(ordered) * 0.95) - 1], 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+    return dict(
+        sorted(summary.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    )
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    """
+    A psycopg2 connection which counts and times the queries executed by its cursors, whatever cursor_factory
+    they are created with. Pass it as the connection_factory of a connection or a pool.
+    """
+
+    def cursor(self, *args, **kwargs):
+        cursor_factory = (
+            kwargs.get("cursor_factory")
+            or self.cursor_factory
+            or psycopg2.extensions.cursor
+        )
+        kwargs["cursor_factory"] = counting_cursor_class(cursor_factory)
+        return super().cursor(*args, **kwargs)
+
+
+@contextmanager
+def stage(stages, name):
+    """
+    Measure one stage of the import. The block is given a dictionary to record what the stage processed, such as
+    `rows` or `bytes`. The wall time and the number of queries issued are added to it when the block ends, and it
+    is stored in `stages` under the stage's name.
+
+    with instrumentation.stage(map_state.setdefault("stages", {}), "align_db_typing") as metrics:
+        metrics["rows"] = ...
+    """
+
+    metrics = {}
+    queries_before = query_count
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics["seconds"] = round(time.perf_counter() - started, 3)
+        metrics["queries"] = query_count - queries_before
+        stages[name] = metrics
+        print(
+            f"{name} took {metrics['seconds']:.2f} s and {metrics['queries']} queries"
+        )
+
+
+class RunReport:
+    """
+    A structured account of an import run: how long each stage took, how many rows, queries and bytes it handled,
+    how the records of each table were reconciled, and how long the queries sent by each helper took. It is written as a JSON document at the end of the run, and
+    can also be appended as a single line to a metrics file, to compare runs over time.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.datetime.now().astimezone()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.logical_groups = []
+        self.totals = {}
+        self.query_stats = {"timings": {}, "slow_queries": []}
+
+    def stage(self, name):
+        return stage(self.stages, name)
+
+    def add_logical_groups(self, imported_groups):
+        for map_state in imported_groups:
+            self.logical_groups.append(
+                {
+                    "logical_group_id": map_state["logical_group_id"],
+                    "import_schema": map_state.get("import_schema"),
+                    "stages": map_state.get("stages", {}),
+                    "tables": map_state.get("table_outcomes", {}),
+                    "dropped_rows": map_state.get("dropped_rows", {}),
+                    "removed_temporary_records": map_state.get(
+                        "removed_temporary_records", []
+                    ),
+                }
+            )
+            if "query_stats" in map_state:
+                merge_query_stats(self.query_stats, map_state["query_stats"])
+
+    def query_summary(self):
+        # the queries sent by this process, along with those sent by any worker processes
+        stats = merge_query_stats({"timings": {}, "slow_queries": []}, self.query_stats)
+        merge_query_stats(
+            stats, {"timings": query_timings, "slow_queries": slow_queries}
+        )
+        return {
+            "by_helper": summarize_query_timings(stats["timings"]),
+            "slow_queries": stats["slow_queries"],
+        }
+
+    def print_query_summary(self, limit=10):
+        print("Queries by helper, most time consuming first:")
+        for helper, summary in list(self.query_summary()["by_helper"].items())[:limit]:
+            print(
+                f"  {helper}: {summary['queries']} queries, {summary['total_ms']:.0f} ms in total, p95 {summary['p95_ms']:.1f} ms, max {summary['max_ms']:.1f} ms"
+            )
+
+    def as_dict(self):
+        outcomes = {}
+        stage_seconds = {}
+        for logical_group in self.logical_groups:
+            for table, table_outcomes in logical_group["tables"].items():
+                for outcome, count in table_outcomes.items():
+                    outcomes.setdefault(table, {}).setdefault(outcome, 0)
+                    outcomes[table][outcome] += count
+            for name, metrics in logical_group["stages"].items():
+                stage_seconds[name] = stage_seconds.get(name, 0) + metrics["seconds"]
+
+        return {
+            "started_at": self.started_at.isoformat(),
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "stages": self.stages,
+            "logical_groups": self.logical_groups,
+            "queries": self.query_summary(),
+            "totals": {
+                **self.totals,
+                "stage_seconds": {
+                    name: round(seconds, 3) for name, seconds in stage_seconds.items()
+                },
+                "tables": outcomes,
+            },
+        }
+
+    def write(self, path):
+        with open(path, "w") as file:
+            json.dump(self.as_dict(), file, indent=2, default=str)
+        print(f"Wrote run report to {path}")
+
+    def append_to_metrics_file(self, path):
+        with open(path, "a") as file:
+            file.write(json.dumps(self.as_dict(), default=str) + "\n")
+        print(f"Appended run metrics to {path}")
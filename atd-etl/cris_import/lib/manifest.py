@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+import datetime
+
+import botocore.exceptions
+
+
+def checksum(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImportManifest:
+    """
+    A record of the archives the import has fetched from the SFTP endpoint, keyed by their SHA-256 checksum, and how
+    far each got: which of its logical groups were imported, the crashes of those groups whose CR3s are still to be
+    invalidated, and whether the archive was imported in full, archived to S3 and removed from the endpoint. A run
+    which fails part way is resumed from it by the next: groups already imported are skipped, and archives which are
+    done with are no longer downloaded.
+
+    The manifest is kept as a JSON file, and copied to S3 each time it's saved when it is given an S3 client,
+    because the container the import runs in doesn't outlive the run.
+    """
+
+    def __init__(self, path, s3=None, bucket=None, key=None):
+        self.path = path
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.archives = {}
+
+    def load(self):
+        if self.s3:
+            try:
+                self.s3.download_file(self.bucket, self.key, self.path)
+            except botocore.exceptions.ClientError as error:
+                if error.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                    raise
+                print(f"No manifest at s3://{self.bucket}/{self.key} yet")
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                self.archives = json.load(file)["archives"]
+        print(f"Manifest lists {len(self.archives)} archives")
+        return self
+
+    def save(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"archives": self.archives}, file, indent=2)
+        os.replace(temporary_path, self.path)
+        if self.s3:
+            self.s3.upload_file(self.path, self.bucket, self.key)
+
+    def register(self, path):
+        """
+        Add a downloaded archive to the manifest, unless an archive with the same contents is already in it
+
+        Returns: The checksum of the archive
+        """
+
+        archive_checksum = checksum(path)
+        entry = self.archives.setdefault(
+            archive_checksum,
+            {
+                "filenames": [],
+                "bytes": os.path.getsize(path),
+                "first_seen": datetime.datetime.now().astimezone().isoformat(),
+                "imported_groups": [],
+                "pending_cr3_invalidations": [],
+                "imported": False,
+                "archived": False,
+                "removed_filenames": [],
+            },
+        )
+        # an archive may be delivered more than once, under other names, each of which is to be removed from the endpoint
+        filename = os.path.basename(path)
+        if filename not in entry["filenames"]:
+            entry["filenames"].append(filename)
+        if filename in entry["removed_filenames"]:
+            entry["removed_filenames"].remove(filename)
+        return archive_checksum
+
+    def is_finished(self, archive_checksum):
+        entry = self.archives[archive_checksum]
+        return entry["imported"] and entry["archived"]
+
+    def is_group_imported(self, archive_checksum, logical_group_id):
+        return logical_group_id in self.archives[archive_checksum]["imported_groups"]
+
+    def mark_group_imported(self, archive_checksum, logical_group_id, cr3_crash_ids):
+        entry = self.archives[archive_checksum]
+        if logical_group_id not in entry["imported_groups"]:
+            entry["imported_groups"].append(logical_group_id)
+        entry["pending_cr3_invalidations"] = sorted(
+            set(entry["pending_cr3_invalidations"]) | set(cr3_crash_ids)
+        )
+
+    def pending_cr3_invalidations(self):
+        crash_ids = set()
+        for entry in self.archives.values():
+            crash_ids |= set(entry["pending_cr3_invalidations"])
+        return crash_ids
+
+    def mark_imported(self, archive_checksums):
+        # called once the pending CR3 invalidations, of these archives and any left over by earlier runs, are done
+        for archive_checksum in archive_checksums:
+            self.archives[archive_checksum]["imported"] = True
+        for entry in self.archives.values():
+            entry["pending_cr3_invalidations"] = []
+
+    def mark_archived(self, archive_checksums):
+        for archive_checksum in archive_checksums:
+            self.archives[archive_checksum]["archived"] = True
+
+    def mark_removed(self, filenames):
+        for entry in self.archives.values():
+            for filename in entry["filenames"]:
+                if filename in filenames and filename not in entry["removed_filenames"]:
+                    entry["removed_filenames"].append(filename)
+
+    def finished_filenames(self):
+        # archives which were imported and archived, and only need removing from the endpoint, if that
+        return sorted(
+            filename
+            for archive_checksum, entry in self.archives.items()
+            if self.is_finished(archive_checksum)
+            for filename in entry["filenames"]
+        )
+
+    def unremoved_filenames(self):
+        return sorted(
+            filename
+            for archive_checksum, entry in self.archives.items()
+            if self.is_finished(archive_checksum)
+            for filename in entry["filenames"]
+            if filename not in entry["removed_filenames"]
+        )
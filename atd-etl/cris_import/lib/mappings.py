@@ -4,90 +4,172 @@
 # hopefully eliminating the need to maintain this file in the future, except when we need
 # to mark a new field as editable by the VZ team.
 
+# How the records of an import table are brought into its VZDB table:
+#
+# upsert: records are matched to VZDB records by their key columns. New records are inserted and changed ones are
+#   updated, column by column. Changes to protected columns are sent to the conflict resolution system instead.
+# replace_by_crash: the VZDB records of each imported crash are brought in line with the imported ones, a batch of
+#   crashes at a time. It suits tables whose key columns don't identify a single record. Records are paired up by
+#   their natural key, and by their order among records which share it. Paired records are updated, keeping their
+#   protected columns, new records are inserted and records CRIS no longer sends are deleted.
+# append_only: imported records are inserted unless a record with the same key is already in the VZDB. Existing
+#   records are never changed.
+UPSERT = "upsert"
+REPLACE_BY_CRASH = "replace_by_crash"
+APPEND_ONLY = "append_only"
+
+
+class TableMapping:
+    """
+    Everything the import needs to know about one of the tables of a CRIS extract
+    """
+
+    def __init__(
+        self,
+        import_table,
+        output_table,
+        key_columns,
+        no_override_columns,
+        natural_key=None,
+        ordering=None,
+        strategy=UPSERT,
+    ):
+        self.import_table = import_table
+        self.output_table = output_table
+        # the columns used to uniquely identify the entity represented by a record
+        self.key_columns = key_columns
+        # the columns which are designated to be protected from updates, as the VZ team edits them
+        self.no_override_columns = no_override_columns
+        # the columns which tell the records of a crash apart from one extract to the next, to pair up the imported
+        # records of a crash with its VZDB records when they're replaced
+        self.natural_key = natural_key or key_columns
+        # the columns which put the records of a crash in a stable order, to pair up records which share a natural key
+        self.ordering = ordering or self.natural_key
+        self.strategy = strategy
+        # the records of tables keyed by more than the crash ID belong to a crash, and can be replaced crash by crash
+        self.is_crash_child = key_columns[0] == "crash_id" and len(key_columns) > 1
+
+
+# The tables of a CRIS extract, in the order they are imported. Built once, and shared by every stage of the import.
+TABLE_REGISTRY = {
+    mapping.import_table: mapping
+    for mapping in [
+        TableMapping(
+            "crash",
+            "atd_txdot_crashes",
+            key_columns=["crash_id"],
+            no_override_columns={
+                "crash_id",  # key column
+                "longitude_primary",
+                "latitude_primary",
+                "city_id",
+                "crash_speed_limit",
+                "road_type_id",
+                "traffic_cntl_id",
+                "crash_sev_id",
+                "atd_fatality_count",
+                "apd_confirmed_death_count",
+                "tot_injry_cnt",
+                "atd_txdot_crashes.sus_serious_injry_cnt",
+                "address_confirmed_primary",
+                "address_confirmed_secondary",
+                "private_dr_fl",
+                "road_constr_zone_fl",
+            },
+        ),
+        TableMapping(
+            "unit",
+            "atd_txdot_units",
+            key_columns=["crash_id", "unit_nbr"],
+            no_override_columns={
+                "crash_id",  # key column
+                "unit_nbr",  # key column
+                "travel_direction",
+                "movement_id",
+                "death_cnt",
+                "sus_serious_injry_cnt",
+            },
+        ),
+        TableMapping(
+            "person",
+            "atd_txdot_person",
+            key_columns=[
+                "crash_id",
+                "unit_nbr",
+                "prsn_nbr",
+                "prsn_type_id",
+                "prsn_occpnt_pos_id",
+            ],
+            no_override_columns={
+                "crash_id",  # key column
+                "unit_nbr",  # key column
+                "prsn_nbr",  # key column
+                "prsn_type_id",  # key column (but why?)
+                "prsn_occpnt_pos_id",  # key column (but why?)
+                "injury_severity",
+                "prsn_age",
+            },
+        ),
+        TableMapping(
+            "primaryperson",
+            "atd_txdot_primaryperson",
+            key_columns=[
+                "crash_id",
+                "unit_nbr",
+                "prsn_nbr",
+                "prsn_type_id",
+                "prsn_occpnt_pos_id",
+            ],
+            no_override_columns={
+                "crash_id",  # key column
+                "unit_nbr",  # key column
+                "prsn_nbr",  # key column
+                "prsn_type_id",  # key column (but why?)
+                "prsn_occpnt_pos_id",  # key column (but why?)
+                "injury_severity",
+                "prsn_age",
+            },
+        ),
+        # a person can be charged more than once, so charges can't be told apart by their keys and are replaced
+        TableMapping(
+            "charges",
+            "atd_txdot_charges",
+            key_columns=["crash_id", "prsn_nbr", "unit_nbr"],
+            no_override_columns={
+                "crash_id",  # key column
+                "prsn_nbr",  # key column
+                "unit_nbr",  # key column
+                "charge_cat_id",  # FIXME in the bigger picture: we have misconfigured schema we store this value in
+            },
+            natural_key=["crash_id", "unit_nbr", "prsn_nbr", "charge", "citation_nbr"],
+            strategy=REPLACE_BY_CRASH,
+        ),
+    ]
+}
+
+TABLE_MAP = {
+    mapping.import_table: mapping.output_table for mapping in TABLE_REGISTRY.values()
+}
+KEY_COLUMNS = {
+    mapping.output_table: mapping.key_columns for mapping in TABLE_REGISTRY.values()
+}
+NO_OVERRIDE_COLUMNS = {
+    mapping.output_table: mapping.no_override_columns
+    for mapping in TABLE_REGISTRY.values()
+}
+
+
+def get_table_registry():
+    return TABLE_REGISTRY
+
 
 def get_table_map():
-    return {
-        "crash": "atd_txdot_crashes",
-        "unit": "atd_txdot_units",
-        "person": "atd_txdot_person",
-        "primaryperson": "atd_txdot_primaryperson",
-        # this table needs to be reworked to use this system
-        # "charges": "atd_txdot_charges",
-    }
+    return TABLE_MAP
 
 
 def get_key_columns():
-    return {
-        "atd_txdot_crashes": ["crash_id"],
-        "atd_txdot_units": ["crash_id", "unit_nbr"],
-        "atd_txdot_primaryperson": [
-            "crash_id",
-            "unit_nbr",
-            "prsn_nbr",
-            "prsn_type_id",
-            "prsn_occpnt_pos_id",
-        ],
-        "atd_txdot_person": [
-            "crash_id",
-            "unit_nbr",
-            "prsn_nbr",
-            "prsn_type_id",
-            "prsn_occpnt_pos_id",
-        ],
-        "atd_txdot_charges": ["crash_id", "prsn_nbr", "unit_nbr"],
-    }
+    return KEY_COLUMNS
 
 
 def no_override_columns():
-    return {
-        "atd_txdot_crashes": {
-            "crash_id",  # key column
-            "longitude_primary",
-            "latitude_primary",
-            "city_id",
-            "crash_speed_limit",
-            "road_type_id",
-            "traffic_cntl_id",
-            "crash_sev_id",
-            "atd_fatality_count",
-            "apd_confirmed_death_count",
-            "tot_injry_cnt",
-            "atd_txdot_crashes.sus_serious_injry_cnt",
-            "address_confirmed_primary",
-            "address_confirmed_secondary",
-            "private_dr_fl",
-            "road_constr_zone_fl",
-        },
-        "atd_txdot_units": {
-            "crash_id",  # key column
-            "unit_nbr",  # key column
-            "travel_direction",
-            "movement_id",
-            "death_cnt",
-            "sus_serious_injry_cnt",
-        },
-        "atd_txdot_person": {
-            "crash_id",  # key column
-            "unit_nbr",  # key column
-            "prsn_nbr",  # key column
-            "prsn_type_id",  # key column (but why?)
-            "prsn_occpnt_pos_id",  # key column (but why?)
-            "injury_severity",
-            "prsn_age",
-        },
-        "atd_txdot_primaryperson": {
-            "crash_id",  # key column
-            "unit_nbr",  # key column
-            "prsn_nbr",  # key column
-            "prsn_type_id",  # key column (but why?)
-            "prsn_occpnt_pos_id",  # key column (but why?)
-            "injury_severity",
-            "prsn_age",
-        },
-        "atd_txdot_charges": {
-            "crash_id",  # key column
-            "prsn_nbr",  # key column
-            "unit_nbr",  # key column
-            "charge_cat_id",  # FIXME in the bigger picture: we have misconfigured schema we store this value in
-        },
-    }
+    return NO_OVERRIDE_COLUMNS
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+
+MB = 1024 * 1024
+
+# Files over the threshold are sent as multipart uploads, with the parts of each file uploaded concurrently
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * MB,
+    multipart_chunksize=16 * MB,
+    max_concurrency=4,
+    use_threads=True,
+)
+
+
+class S3Archiver:
+    """
+    Archives the CSVs of extracted CRIS archives to S3 from a pool of background threads, so the uploads run while
+    the import works through the database stages. Directories are submitted as they are extracted, and `wait()`
+    blocks until every file is uploaded, raising the first error any upload ran into. Use it as a context manager,
+    so the threads are shut down however the run ends, and the uploads still queued are cancelled if it failed.
+    """
+
+    def __init__(
+        self,
+        access_key_id,
+        secret_access_key,
+        bucket,
+        path,
+        workers=4,
+        transfer_config=TRANSFER_CONFIG,
+    ):
+        session = boto3.Session(
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+        # unlike resources, clients are safe to share between threads
+        self.s3 = session.client("s3")
+        self.bucket = bucket
+        self.destination_path = path + "/" + str(datetime.date.today())
+        self.transfer_config = transfer_config
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="s3-archive"
+        )
+        self.futures = []
+        self.lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.started = None
+        self.finished = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    def submit(self, extract_directory):
+        if self.started is None:
+            self.started = time.perf_counter()
+        for filename in sorted(os.listdir(extract_directory)):
+            self.futures.append(
+                self.executor.submit(self.upload, extract_directory, filename)
+            )
+
+    def upload(self, extract_directory, filename):
+        source = os.path.join(extract_directory, filename)
+        size = os.path.getsize(source)
+        self.s3.upload_file(
+            source,
+            self.bucket,
+            self.destination_path + "/" + filename,
+            Config=self.transfer_config,
+        )
+        with self.lock:
+            self.files += 1
+            self.bytes += size
+            self.finished = time.perf_counter()
+        print(f"Archived {filename} to s3 ({size / MB:.1f} MB)")
+
+    def wait(self):
+        """
+        Block until every submitted file is uploaded
+
+        Returns: A dictionary of the number of files and bytes uploaded, the seconds from the first submission to the
+        last upload, the throughput, and how long the caller was kept waiting
+        """
+
+        waiting_since = time.perf_counter()
+        wait(self.futures)
+        waited = time.perf_counter() - waiting_since
+        for future in self.futures:
+            future.result()
+
+        seconds = (self.finished or waiting_since) - (self.started or waiting_since)
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "seconds": round(seconds, 3),
+            "mb_per_second": round(self.bytes / MB / max(seconds, 0.001), 1),
+            "waited_seconds": round(waited, 3),
+        }
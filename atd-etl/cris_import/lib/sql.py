@@ -1,4 +1,6 @@
 import os
+import re
+import itertools
 import psycopg2.extras
 
 import pprint
@@ -23,12 +25,112 @@ def get_pgfutter_path():
     return None
 
 
-def invalidate_cr3(pg, crash_id):
+# numbers the prepared statements of every PreparedStatements of the process
+STATEMENT_NUMBERS = itertools.count()
+
+
+class PreparedStatements:
+    """
+    Server side prepared statements for one connection. The first time a statement is executed it is
+    PREPAREd, with its `%(name)s` placeholders turned into typed `$n` parameters, and every execution
+    after that is an EXECUTE which skips parsing and planning the SQL text again.
+
+    The planning time of each statement is measured once with EXPLAIN, so the time saved by not
+    re-planning it on every execution can be estimated for the run summary.
+
+    Prepared statements outlive transactions, and the connection goes back to the pool when the import is
+    done with it, so use it as a context manager to deallocate the statements however the import ends.
+    """
+
+    def __init__(self, pg):
+        self.pg = pg
+        self.statements = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.pg.closed:
+            return
+        # DEALLOCATE can't run in a transaction which an error has aborted
+        if (
+            self.pg.get_transaction_status()
+            == psycopg2.extensions.TRANSACTION_STATUS_INERROR
+        ):
+            self.pg.rollback()
+        self.deallocate()
+
+    def prepare(self, sql, values, parameter_types):
+        parameters = []
+
+        def number_parameter(match):
+            if match.group(1) not in parameters:
+                parameters.append(match.group(1))
+            return f"${parameters.index(match.group(1)) + 1}"
+
+        body = re.sub(r"%\((\w+)\)s", number_parameter, sql)
+        # the names are unique to the process, so they can't collide with those of another instance on the connection
+        name = f"cris_import_statement_{next(STATEMENT_NUMBERS)}"
+        types = ", ".join([parameter_types[parameter] for parameter in parameters])
+
+        cursor = self.pg.cursor()
+        cursor.execute(f"PREPARE {name} ({types}) AS {body}")
+
+        # kept as soon as it's prepared, so it's deallocated even if the EXPLAIN fails
+        statement = self.statements[sql] = {
+            "name": name,
+            "parameters": parameters,
+            "planning_ms": 0.0,
+            "executions": 0,
+        }
+
+        # EXPLAIN without ANALYZE plans the statement but does not run it
+        cursor.execute("EXPLAIN (SUMMARY true) " + sql, values)
+        for (line,) in cursor.fetchall():
+            if line.startswith("Planning Time:"):
+                statement["planning_ms"] = float(line.split()[2])
+
+        return statement
+
+    def execute(self, sql, values, parameter_types):
+        statement = self.statements.get(sql) or self.prepare(
+            sql, values, parameter_types
+        )
+
+        placeholders = ", ".join(["%s"] * len(statement["parameters"]))
+        cursor = self.pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(
+            f"EXECUTE {statement['name']} ({placeholders})",
+            [values[parameter] for parameter in statement["parameters"]],
+        )
+        statement["executions"] += 1
+        return cursor
+
+    def summary(self):
+        saved_ms = 0.0
+        executions = 0
+        for statement in self.statements.values():
+            executions += statement["executions"]
+            saved_ms += statement["planning_ms"] * max(statement["executions"] - 1, 0)
+        return {
+            "prepared_statements": len(self.statements),
+            "executions": executions,
+            "estimated_planning_ms_saved": round(saved_ms, 1),
+        }
+
+    def deallocate(self):
+        cursor = self.pg.cursor()
+        for statement in self.statements.values():
+            cursor.execute(f"DEALLOCATE {statement['name']}")
+        self.statements = {}
+
+
+def invalidate_cr3s(pg, crash_ids):
     invalidate_cr3_sql = f"""UPDATE public.atd_txdot_crashes 
     SET cr3_stored_flag = 'N', cr3_file_metadata = null, cr3_ocr_extraction_date = null
-    WHERE crash_id = {crash_id}"""
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(invalidate_cr3_sql)
+    WHERE crash_id = any(%(crash_ids)s)"""
+    cursor = pg.cursor()
+    cursor.execute(invalidate_cr3_sql, {"crash_ids": sorted(crash_ids)})
     pg.commit()
 
 
@@ -89,11 +191,10 @@ def get_column_operators(
     )
 
 
-def check_if_update_is_a_non_op(
-    pg,
-    column_comparisons,
+def form_non_op_query(
     output_map,
     table,
+    column_comparisons,
     linkage_clauses,
     public_key_sql,
     DB_IMPORT_SCHEMA,
@@ -106,9 +207,12 @@ def check_if_update_is_a_non_op(
         + ")\n"
     )
     sql += f"where {public_key_sql}\n"
+    return sql
+
 
+def check_if_update_is_a_non_op(pg, non_op_query, key_values):
     cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
+    cursor.execute(non_op_query, key_values)
     skip_update_query = cursor.fetchone()
     if skip_update_query["skip_update"]:
         return True
@@ -116,11 +220,10 @@ def check_if_update_is_a_non_op(
         return False
 
 
-def get_changed_columns(
-    pg,
-    column_aggregators,
+def form_changed_columns_query(
     output_map,
     table,
+    column_aggregators,
     linkage_clauses,
     public_key_sql,
     DB_IMPORT_SCHEMA,
@@ -139,34 +242,41 @@ def get_changed_columns(
         + ")\n"
     )
     sql += f"where {public_key_sql}\n"
+    return sql
+
+
+def get_changed_columns(pg, changed_columns_query, key_values):
     cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
+    cursor.execute(changed_columns_query, key_values)
     changed_columns = cursor.fetchone()
     return changed_columns
 
 
-def get_key_clauses(table_keys, output_map, table, source, DB_IMPORT_SCHEMA):
-    # form some snippets we'll reuse
+def get_key_clauses(key_columns, output_map, table, DB_IMPORT_SCHEMA):
+    # form some snippets we'll reuse. The key values are left as named placeholders for psycopg2 to bind.
     public_key_clauses = []
     import_key_clauses = []
-    for key in table_keys[output_map[table]]:
-        public_key_clauses.append(f"public.{output_map[table]}.{key} = {source[key]}")
-        import_key_clauses.append(f"{DB_IMPORT_SCHEMA}.{table}.{key} = {source[key]}")
+    for key in key_columns:
+        public_key_clauses.append(f"public.{output_map[table]}.{key} = %({key})s")
+        import_key_clauses.append(f"{DB_IMPORT_SCHEMA}.{table}.{key} = %({key})s")
     public_key_sql = " and ".join(public_key_clauses)
     import_key_sql = " and ".join(import_key_clauses)
     return public_key_sql, import_key_sql
 
 
-def fetch_target_record(pg, output_map, table, public_key_sql):
-    # build and execute a query to find our target record; we're looking for it to exist
+def form_fetch_target_query(output_map, table, public_key_sql):
+    # build a query to find our target record; we're looking for it to exist
     sql = f"""
     select * 
     from public.{output_map[table]}
     where 
     {public_key_sql}
     """
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
+    return sql
+
+
+def fetch_target_record(statements, plan, key_values):
+    cursor = statements.execute(plan.fetch_target_query, key_values, plan.key_types)
     target = cursor.fetchone()
     return target
 
@@ -179,12 +289,16 @@ def form_update_statement(
     public_key_sql,
     linkage_sql,
     changed_columns,
+    row_hash_sql=None,
 ):
     sql = "update public." + output_map[table] + " set "
 
     required_assignments = []
     for changed_column in set(changed_columns["changed_columns"]):
         required_assignments.append(column_assignments[changed_column])
+    # the updated record holds the imported data now, so it takes on the imported record's hash
+    if row_hash_sql:
+        required_assignments.append(f"cris_row_hash = {row_hash_sql}")
     sql += ", ".join(required_assignments) + " "
 
     sql += f"""
@@ -197,95 +311,990 @@ def form_update_statement(
 
 
 def form_insert_statement(
-    output_map, table, input_column_names, import_key_sql, DB_IMPORT_SCHEMA
+    output_map,
+    table,
+    input_column_names,
+    import_key_sql,
+    DB_IMPORT_SCHEMA,
+    row_hash_sql=None,
 ):
+    columns = list(input_column_names)
+    values = list(input_column_names)
+    if row_hash_sql:
+        columns.append("cris_row_hash")
+        values.append(row_hash_sql)
     sql = f"insert into public.{output_map[table]} "
-    sql += "(" + ", ".join(input_column_names) + ") "
+    sql += "(" + ", ".join(columns) + ") "
     sql += "(select "
-    sql += ", ".join(input_column_names)
+    sql += ", ".join(values)
     sql += f" from {DB_IMPORT_SCHEMA}.{table}"
     sql += f" where {import_key_sql})"
     return sql
 
 
-def is_change_existing(pg, record_type, record_id):
-    # print(f"\b 🛎 is existing? {record_type}, {record_id}")
+class TablePlan:
+    """
+    The SQL used to reconcile one import table with its VZDB table. None of it depends on the values of
+    an individual record, so a plan is compiled once per table and import schema and reused for every record.
+    Key values are never written into the statements; they carry `%(key)s` placeholders bound by psycopg2.
+    """
+
+    def __init__(
+        self,
+        output_map,
+        table,
+        DB_IMPORT_SCHEMA,
+        key_columns,
+        target_columns,
+        input_column_names,
+        no_override_columns,
+    ):
+        # fmt: off
+        self.table = table
+        self.target_table = output_map[table]
+        self.import_schema = DB_IMPORT_SCHEMA
+        self.key_columns = key_columns
+        self.target_columns = target_columns
+        self.input_column_names = input_column_names
+        self.key_types = {column["column_name"]: column["data_type"] for column in target_columns if column["column_name"] in key_columns}
+
+        (
+            self.column_assignments,
+            self.column_comparisons,
+            self.column_aggregators,
+            self.important_column_assignments,
+            self.important_column_comparisons,
+            self.important_column_aggregators,
+        ) = get_column_operators(target_columns, no_override_columns, input_column_names, table, output_map, DB_IMPORT_SCHEMA)
+
+        # Target tables with a cris_row_hash column remember a hash of the CRIS data each record was last written with.
+        # Imported records with the same hash are known to be unchanged without comparing them column by column.
+        self.row_hash_sql = None
+        if "cris_row_hash" in [column["column_name"] for column in target_columns]:
+            self.row_hash_sql = form_row_hash_sql(table, input_column_names, DB_IMPORT_SCHEMA)
+
+        self.linkage_clauses, self.linkage_sql = get_linkage_constructions(key_columns, output_map, table, DB_IMPORT_SCHEMA)
+        self.public_key_sql, self.import_key_sql = get_key_clauses(key_columns, output_map, table, DB_IMPORT_SCHEMA)
+
+        self.fetch_target_query = form_fetch_target_query(output_map, table, self.public_key_sql)
+        self.non_op_query = form_non_op_query(output_map, table, self.column_comparisons, self.linkage_clauses, self.public_key_sql, DB_IMPORT_SCHEMA)
+        self.changed_columns_query = form_changed_columns_query(output_map, table, self.column_aggregators, self.linkage_clauses, self.public_key_sql, DB_IMPORT_SCHEMA)
+        self.important_changed_columns_query = form_changed_columns_query(output_map, table, self.important_column_aggregators, self.linkage_clauses, self.public_key_sql, DB_IMPORT_SCHEMA)
+        self.insert_statement = form_insert_statement(output_map, table, input_column_names, self.import_key_sql, DB_IMPORT_SCHEMA, self.row_hash_sql)
+        self.diff_query = form_record_diff_query(output_map, table, key_columns, self.linkage_clauses, self.column_comparisons, self.column_aggregators, self.important_column_aggregators, DB_IMPORT_SCHEMA, self.row_hash_sql)
+
+        # update statements only assign the columns which changed, so they are compiled as different sets of changes show up
+        self.output_map = output_map
+        self.update_statements = {}
+        # fmt: on
+
+    def key_values(self, record):
+        return {key: record[key] for key in self.key_columns}
+
+    def update_statement(self, changed_columns):
+        changed_set = frozenset(changed_columns["changed_columns"])
+        if changed_set not in self.update_statements:
+            self.update_statements[changed_set] = form_update_statement(
+                self.output_map,
+                self.table,
+                self.column_assignments,
+                self.import_schema,
+                self.public_key_sql,
+                self.linkage_sql,
+                changed_columns,
+                self.row_hash_sql,
+            )
+        return self.update_statements[changed_set]
+
+
+TABLE_PLANS = {}
+
 
+def get_table_plan(
+    pg, output_map, table, DB_IMPORT_SCHEMA, key_columns, no_override_columns
+):
+    # plans are cached by table and import schema, as the columns of the import tables can differ between logical groups
+    if (table, DB_IMPORT_SCHEMA) not in TABLE_PLANS:
+        target_columns = get_target_columns(pg, output_map, table)
+        input_column_names = get_input_column_names(
+            pg, DB_IMPORT_SCHEMA, table, target_columns
+        )
+        TABLE_PLANS[(table, DB_IMPORT_SCHEMA)] = TablePlan(
+            output_map,
+            table,
+            DB_IMPORT_SCHEMA,
+            key_columns,
+            target_columns,
+            input_column_names,
+            no_override_columns,
+        )
+    return TABLE_PLANS[(table, DB_IMPORT_SCHEMA)]
+
+
+def form_record_diff_query(
+    output_map,
+    table,
+    key_columns,
+    linkage_clauses,
+    column_comparisons,
+    column_aggregators,
+    important_column_aggregators,
+    DB_IMPORT_SCHEMA,
+    row_hash_sql=None,
+):
+    # This is the set-based equivalent of running fetch_target_record, check_if_update_is_a_non_op and
+    # both get_changed_columns calls for every record. The query returns one row per imported record
+    # with its key, whether a target exists, whether the update would be a non-op and the changed columns.
+
+    # fmt: off
+    # an empty array[] has no type in postgres, so the empty case is spelled out
+    def aggregate(aggregators):
+        if not aggregators:
+            return "'{}'::text[]"
+        return "array_remove(array[" + ",".join(aggregators) + "], null)"
+
+    # A record whose hash matches the one stored with its target is unchanged, and the column by column
+    # comparisons are skipped for it. The hash is computed once per record in a lateral subquery.
+    def unless_hash_matches(unchanged, expression):
+        if not row_hash_sql:
+            return expression
+        return f"case when public.{output_map[table]}.cris_row_hash = row_hash.import_row_hash then {unchanged} else {expression} end"
+
+    import_keys = [f"{DB_IMPORT_SCHEMA}.{table}.{key}" for key in key_columns]
+
+    sql = "select " + ", ".join(import_keys) + ", "
+    sql += f"public.{output_map[table]}.{key_columns[0]} is not null as target_exists, "
+    if row_hash_sql:
+        sql += "row_hash.import_row_hash, "
+        sql += f"coalesce(public.{output_map[table]}.cris_row_hash = row_hash.import_row_hash, false) as row_hash_matched, "
+    else:
+        sql += "null::text as import_row_hash, false as row_hash_matched, "
+    sql += unless_hash_matches("true", "coalesce((" + (" and ".join(column_comparisons) or "true") + "), false)") + " as skip_update, "
+    sql += unless_hash_matches("'{}'::text[]", aggregate(column_aggregators)) + " as changed_columns, "
+    sql += unless_hash_matches("'{}'::text[]", aggregate(important_column_aggregators)) + " as important_changed_columns "
+    sql += f"from {DB_IMPORT_SCHEMA}.{table} "
+    sql += f"left join public.{output_map[table]} on (" + " and ".join(linkage_clauses) + ")"
+    if row_hash_sql:
+        sql += f" cross join lateral (select {row_hash_sql} as import_row_hash) as row_hash"
+    # fmt: on
+    return sql
+
+
+def form_row_hash_sql(table, input_column_names, DB_IMPORT_SCHEMA):
+    # The columns are hashed in name order, so the hash doesn't depend on the column order of the CSVs.
+    # A new or removed CRIS column changes every hash, which only costs one full comparison of each record.
+    columns = [
+        f"{DB_IMPORT_SCHEMA}.{table}.{column}" for column in sorted(input_column_names)
+    ]
+    return "md5(row(" + ", ".join(columns) + ")::text)"
+
+
+def form_row_hash_backfill_query(output_map, table, input_column_names):
+    # The hash is only stored along with a change, so records which were up to date when the column was added get
+    # theirs from cris_row_hash_backfill(), which hashes the same columns as form_row_hash_sql without firing triggers
+    columns = ", ".join(f"'{column}'" for column in sorted(input_column_names))
+    return (
+        f"select cris_row_hash_backfill('public.{output_map[table]}', array[{columns}])"
+    )
+
+
+def get_record_ordering(key_columns, table, DB_IMPORT_SCHEMA):
+    # The physical row location breaks ties between records which share a key, so that imported records
+    # and their differences come back in exactly the same order and can be walked side by side.
+    columns = [f"{DB_IMPORT_SCHEMA}.{table}.{key}" for key in key_columns]
+    columns.append(f"{DB_IMPORT_SCHEMA}.{table}.ctid")
+    return "order by " + ", ".join(columns)
+
+
+def create_record_diff_table(pg, diff_query, table, DB_IMPORT_SCHEMA):
+    # One row per imported record is written into a scratch table in the import schema,
+    # which is dropped along with the rest of the schema at cleanup.
+    diff_table = f"{DB_IMPORT_SCHEMA}.{table}_diff"
+
+    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor.execute(f"drop table if exists {diff_table}")
+    cursor.execute(f"create table {diff_table} as {diff_query}")
+    pg.commit()
+    return diff_table
+
+
+def stream_record_differences(
+    pg, diff_query, key_columns, table, DB_IMPORT_SCHEMA, itersize=2000
+):
+    # A named cursor keeps the result set on the server and hands it over `itersize` rows at a time.
+    # It is declared WITH HOLD so the commits made while the caller walks it don't close it.
+    cursor = pg.cursor(
+        name=f"record_differences_{table}",
+        cursor_factory=psycopg2.extras.RealDictCursor,
+        withhold=True,
+    )
+    cursor.itersize = itersize
+    cursor.execute(
+        diff_query + " " + get_record_ordering(key_columns, table, DB_IMPORT_SCHEMA)
+    )
+    try:
+        for difference in cursor:
+            yield difference
+    finally:
+        cursor.close()
+
+
+def get_diff_linkage_sql(key_columns, table, DB_IMPORT_SCHEMA):
+    clauses = []
+    for column in key_columns:
+        clauses.append(
+            f"{DB_IMPORT_SCHEMA}.{table}.{column} = {DB_IMPORT_SCHEMA}.{table}_diff.{column}"
+        )
+    return " and ".join(clauses)
+
+
+def get_record_partition_counts(pg, DB_IMPORT_SCHEMA, table):
+    # the partitions mirror the branches of the per-record loop in align_records
     sql = f"""
-    select count(*) as exists
-    from atd_txdot_changes_view
-    where record_id = {record_id}
+    select
+        count(*) filter (where not target_exists) as inserts,
+        count(*) filter (where target_exists and skip_update) as no_ops,
+        count(*) filter (where target_exists and not skip_update
+            and cardinality(important_changed_columns) = 0) as updates,
+        count(*) filter (where target_exists and not skip_update
+            and cardinality(important_changed_columns) > 0) as conflicts,
+        count(*) filter (where row_hash_matched) as unchanged_by_hash
+    from {DB_IMPORT_SCHEMA}.{table}_diff
     """
-
     cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     cursor.execute(sql)
-    change_request_exists = cursor.fetchone()
-    if change_request_exists["exists"] > 0:
-        return True
+    return cursor.fetchone()
+
+
+def get_matched_crash_ids(pg, DB_IMPORT_SCHEMA, table, changed_only):
+    sql = f"""
+    select distinct crash_id
+    from {DB_IMPORT_SCHEMA}.{table}_diff
+    where target_exists
+    """
+    if changed_only:
+        # changes to protected columns count too, even when the import leaves the record alone
+        sql += "and (not skip_update or cardinality(important_changed_columns) > 0)\n"
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def stream_record_outcomes(
+    pg, key_columns, DB_IMPORT_SCHEMA, table, append_only=False, itersize=2000
+):
+    # The outcome of every imported record, sorted as get_record_partition_counts sorts them, for dry run reports.
+    # They're handed over `itersize` rows at a time by a named cursor, so they never need to fit in memory at once.
+    if append_only:
+        existing_outcome = "'skip'"
     else:
-        return False
+        existing_outcome = """case
+            when skip_update then 'skip'
+            when cardinality(important_changed_columns) > 0 then 'conflict'
+            else 'update'
+        end"""
+    sql = f"""
+    select {", ".join(key_columns)},
+        case when not target_exists then 'insert' else {existing_outcome} end as outcome,
+        case when target_exists and not skip_update then changed_columns else '{{}}' end as changed_columns,
+        case when target_exists and not skip_update then important_changed_columns else '{{}}' end as important_changed_columns
+    from {DB_IMPORT_SCHEMA}.{table}_diff
+    """
+    cursor = pg.cursor(
+        name=f"record_outcomes_{table}", cursor_factory=psycopg2.extras.RealDictCursor
+    )
+    cursor.itersize = itersize
+    cursor.execute(sql)
+    try:
+        for record in cursor:
+            yield record
+    finally:
+        cursor.close()
+
+
+def stream_import_keys(
+    pg, key_columns, DB_IMPORT_SCHEMA, table, crash_ids, itersize=2000
+):
+    # the keys of the imported records of the given crashes, handed over `itersize` rows at a time
+    cursor = pg.cursor(
+        name=f"import_keys_{table}", cursor_factory=psycopg2.extras.RealDictCursor
+    )
+    cursor.itersize = itersize
+    cursor.execute(
+        f"""
+        select {", ".join(key_columns)}
+        from {DB_IMPORT_SCHEMA}.{table}
+        where crash_id = any(%(crash_ids)s)
+        """,
+        {"crash_ids": list(crash_ids)},
+    )
+    try:
+        for record in cursor:
+            yield record
+    finally:
+        cursor.close()
 
 
-def has_existing_temporary_record(pg, case_id):
+def load_conflicting_records(pg, key_columns, DB_IMPORT_SCHEMA, table):
+    diff_linkage_sql = get_diff_linkage_sql(key_columns, table, DB_IMPORT_SCHEMA)
     sql = f"""
-    select count(*) as exists
-    from atd_txdot_crashes
-    where crash_id < 10000
-    and case_id = '{case_id}'
+    select {DB_IMPORT_SCHEMA}.{table}.*,
+        {DB_IMPORT_SCHEMA}.{table}_diff.changed_columns as diff_changed_columns,
+        {DB_IMPORT_SCHEMA}.{table}_diff.important_changed_columns as diff_important_changed_columns
+    from {DB_IMPORT_SCHEMA}.{table}
+    join {DB_IMPORT_SCHEMA}.{table}_diff on ({diff_linkage_sql})
+    where {DB_IMPORT_SCHEMA}.{table}_diff.target_exists
+    and not {DB_IMPORT_SCHEMA}.{table}_diff.skip_update
+    and cardinality({DB_IMPORT_SCHEMA}.{table}_diff.important_changed_columns) > 0
     """
     cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     cursor.execute(sql)
-    change_request_exists = cursor.fetchone()
-    if change_request_exists["exists"] > 0:
-        return True
-    else:
-        return False
+    return cursor.fetchall()
 
 
-def remove_existing_temporary_record(pg, case_id):
+def get_changed_column_sets(pg, DB_IMPORT_SCHEMA, table):
+    # the distinct sets of columns which changed in the records to be updated, each of which gets its own bulk update
     sql = f"""
+    select distinct changed_columns
+    from {DB_IMPORT_SCHEMA}.{table}_diff
+    where target_exists and not skip_update and cardinality(important_changed_columns) = 0
+    """
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def stream_partition_keys(
+    pg,
+    key_columns,
+    DB_IMPORT_SCHEMA,
+    table,
+    partition,
+    changed_columns=None,
+    itersize=2000,
+):
+    # The keys of the records of a partition, to apply them one at a time when their bulk statement fails. Updates
+    # are those with the changed columns given. The cursor is held, as the statements which follow are committed.
+    conditions = {
+        "inserts": "not target_exists",
+        "updates": """target_exists and not skip_update and cardinality(important_changed_columns) = 0
+            and changed_columns = %(changed_columns)s::text[]""",
+    }
+    cursor = pg.cursor(
+        name=f"partition_keys_{table}",
+        cursor_factory=psycopg2.extras.RealDictCursor,
+        withhold=True,
+    )
+    cursor.itersize = itersize
+    cursor.execute(
+        f"""
+        select {", ".join(key_columns)}
+        from {DB_IMPORT_SCHEMA}.{table}_diff
+        where {conditions[partition]}
+        """,
+        {"changed_columns": changed_columns},
+    )
+    try:
+        for record in cursor:
+            yield record
+    finally:
+        cursor.close()
+
+
+def form_bulk_update_statement(
+    output_map,
+    table,
+    column_assignments,
+    changed_columns,
+    key_columns,
+    linkage_clauses,
+    DB_IMPORT_SCHEMA,
+    row_hash_sql=None,
+):
+    # Updates the records whose changed columns are those given, bound as %(changed_columns)s, and only assigns
+    # those columns, as the per-record update of each of them would.
+    diff_linkage_sql = get_diff_linkage_sql(key_columns, table, DB_IMPORT_SCHEMA)
+    assignments = [column_assignments[column] for column in changed_columns]
+    if row_hash_sql:
+        assignments.append(
+            f"cris_row_hash = {DB_IMPORT_SCHEMA}.{table}_diff.import_row_hash"
+        )
+    sql = f"update public.{output_map[table]} set "
+    sql += ", ".join(assignments) + " "
+    sql += f"""
+    from {DB_IMPORT_SCHEMA}.{table}
+    join {DB_IMPORT_SCHEMA}.{table}_diff on ({diff_linkage_sql})
+    where {" and ".join(linkage_clauses)}
+    and {DB_IMPORT_SCHEMA}.{table}_diff.target_exists
+    and not {DB_IMPORT_SCHEMA}.{table}_diff.skip_update
+    and cardinality({DB_IMPORT_SCHEMA}.{table}_diff.important_changed_columns) = 0
+    and {DB_IMPORT_SCHEMA}.{table}_diff.changed_columns = %(changed_columns)s::text[]
+    """
+    return sql
+
+
+def form_bulk_insert_statement(
+    output_map,
+    table,
+    input_column_names,
+    linkage_clauses,
+    DB_IMPORT_SCHEMA,
+    row_hash_sql=None,
+):
+    columns = list(input_column_names)
+    values = [f"{DB_IMPORT_SCHEMA}.{table}.{c}" for c in input_column_names]
+    if row_hash_sql:
+        columns.append("cris_row_hash")
+        values.append(row_hash_sql)
+    sql = f"insert into public.{output_map[table]} "
+    sql += "(" + ", ".join(columns) + ") "
+    sql += "(select "
+    sql += ", ".join(values)
+    sql += f" from {DB_IMPORT_SCHEMA}.{table}"
+    sql += f" where not exists (select 1 from public.{output_map[table]}"
+    sql += " where " + " and ".join(linkage_clauses) + "))"
+    return sql
+
+
+def get_text_column_names(target_columns):
+    # an empty string and a null are taken to be the same value of these columns, as in get_column_operators
+    return {
+        column["column_name"]
+        for column in target_columns
+        if column["data_type"] in ("character varying", "text")
+    }
+
+
+def form_comparable_value(column, alias, text_column_names):
+    if column in text_column_names:
+        return f"nullif({alias}.{column}, '')"
+    return f"{alias}.{column}"
+
+
+def form_crash_record_pairing_sql(
+    output_map,
+    table,
+    target_columns,
+    input_column_names,
+    natural_key,
+    ordering,
+    DB_IMPORT_SCHEMA,
+    row_hash_sql=None,
+):
+    # The CTEs which pair up the imported records of a batch of crashes, given as %(crash_ids)s, with their VZDB records.
+    # Records are paired by their natural key, and records which share it by their position in the table's ordering,
+    # so a record is never paired with one which has a different natural key. `paired` holds every imported record,
+    # along with the ctid of the VZDB record it's paired with, if any, as existing_ctid.
+    text_column_names = get_text_column_names(target_columns)
+    pairing_columns = [column for column in natural_key if column in input_column_names]
+    order = ", ".join(
+        [column for column in ordering if column in input_column_names] + ["ctid"]
+    )
+    pairing = " and ".join(
+        f"{form_comparable_value(column, 'existing', text_column_names)} is not distinct from "
+        + form_comparable_value(column, "imported", text_column_names)
+        for column in pairing_columns
+    )
+
+    def partition(alias):
+        return ", ".join(
+            form_comparable_value(column, alias, text_column_names)
+            for column in pairing_columns
+        )
+
+    return f"""
+    imported as (
+        select *, row_number() over (partition by {partition(f"{DB_IMPORT_SCHEMA}.{table}")} order by {order}) as pairing_position
+            {f", {row_hash_sql} as import_row_hash" if row_hash_sql else ""}
+        from {DB_IMPORT_SCHEMA}.{table}
+        where crash_id = any(%(crash_ids)s)
+    ),
+    existing as (
+        select ctid as existing_ctid, {", ".join(pairing_columns)},
+            row_number() over (partition by {partition(f"public.{output_map[table]}")} order by {order}) as pairing_position
+        from public.{output_map[table]}
+        where crash_id = any(%(crash_ids)s)
+    ),
+    paired as (
+        select existing.existing_ctid, imported.*
+        from imported
+        left join existing on {pairing} and existing.pairing_position = imported.pairing_position
+    )
+    """
+
+
+def get_replacement_columns(
+    target_columns, input_column_names, natural_key, no_override_columns
+):
+    # the columns imported records are inserted with, and the columns paired records are updated with
+    insert_columns = [
+        column["column_name"]
+        for column in target_columns
+        if column["column_name"] in input_column_names and not column["is_generated"]
+    ]
+    update_columns = [
+        column
+        for column in insert_columns
+        if column not in natural_key and column not in no_override_columns
+    ]
+    return insert_columns, update_columns
+
+
+def form_replacement_value(column, alias, target_columns):
+    # Typing turns blank values into nulls, which a NOT NULL column with a default, such as the charge and citation
+    # number of a charge, can't hold. Those columns get their default instead, as if CRIS had left the value out.
+    for target_column in target_columns:
+        if (
+            target_column["column_name"] == column
+            and not target_column["is_nullable"]
+            and target_column["column_default"] is not None
+        ):
+            return f"coalesce({alias}.{column}, {target_column['column_default']})"
+    return f"{alias}.{column}"
+
+
+def form_replaced_record_change_sql(update_columns, target_columns):
+    # whether CRIS changed any of the columns a paired record is updated with
+    if not update_columns:
+        return "false"
+    text_column_names = get_text_column_names(target_columns)
+    target = ", ".join(
+        form_comparable_value(column, "target", text_column_names)
+        for column in update_columns
+    )
+    imported = ", ".join(
+        form_comparable_value(column, "paired", text_column_names)
+        for column in update_columns
+    )
+    return f"row({target}) is distinct from row({imported})"
+
+
+def form_replace_by_crash_statement(
+    output_map,
+    table,
+    target_columns,
+    input_column_names,
+    natural_key,
+    no_override_columns,
+    ordering,
+    DB_IMPORT_SCHEMA,
+    row_hash_sql=None,
+    remove_unmatched=True,
+):
+    # Brings the VZDB records of a batch of crashes, given as %(crash_ids)s, in line with the imported ones in a single
+    # statement. Paired records are updated in place, and only when CRIS changed one of their unprotected columns, so
+    # they keep their IDs, their protected columns and the columns CRIS doesn't provide, and triggers see an update
+    # rather than a new record. Imported records without a pair are inserted, and VZDB records without one are
+    # deleted, unless `remove_unmatched` is off.
+    pairing_sql = form_crash_record_pairing_sql(
+        output_map,
+        table,
+        target_columns,
+        input_column_names,
+        natural_key,
+        ordering,
+        DB_IMPORT_SCHEMA,
+        row_hash_sql,
+    )
+    insert_columns, update_columns = get_replacement_columns(
+        target_columns, input_column_names, natural_key, no_override_columns
+    )
+    insert_values = [
+        form_replacement_value(column, "paired", target_columns)
+        for column in insert_columns
+    ]
+    assignments = [
+        f"{column} = {form_replacement_value(column, 'paired', target_columns)}"
+        for column in update_columns
+    ]
+    if row_hash_sql:
+        insert_columns = insert_columns + ["cris_row_hash"]
+        insert_values.append("paired.import_row_hash")
+        assignments.append("cris_row_hash = paired.import_row_hash")
+
+    sql = f"with {pairing_sql}"
+    if remove_unmatched:
+        sql += f""",
+    removed as (
+        delete from public.{output_map[table]} as target
+        where target.crash_id = any(%(crash_ids)s)
+        and not exists (select 1 from paired where paired.existing_ctid = target.ctid)
+    )"""
+    if update_columns:
+        sql += f""",
+    updated as (
+        update public.{output_map[table]} as target
+        set {", ".join(assignments)}
+        from paired
+        where target.crash_id = any(%(crash_ids)s)
+        and target.ctid = paired.existing_ctid
+        and {form_replaced_record_change_sql(update_columns, target_columns)}
+    )"""
+    sql += f"""
+    insert into public.{output_map[table]} ({", ".join(insert_columns)})
+    select {", ".join(insert_values)}
+    from paired
+    where paired.existing_ctid is null
+    """
+    return sql
+
+
+def form_replacement_counts_query(
+    output_map,
+    table,
+    target_columns,
+    input_column_names,
+    natural_key,
+    no_override_columns,
+    ordering,
+    DB_IMPORT_SCHEMA,
+    remove_unmatched=True,
+):
+    # how many records form_replace_by_crash_statement would insert, update and delete for the crashes given
+    pairing_sql = form_crash_record_pairing_sql(
+        output_map,
+        table,
+        target_columns,
+        input_column_names,
+        natural_key,
+        ordering,
+        DB_IMPORT_SCHEMA,
+    )
+    _, update_columns = get_replacement_columns(
+        target_columns, input_column_names, natural_key, no_override_columns
+    )
+    deletes = "(select count(*) from existing) - count(paired.existing_ctid)"
+    sql = f"""
+    with {pairing_sql}
+    select
+        (select count(distinct crash_id) from imported) as replaced_crashes,
+        count(*) filter (where paired.existing_ctid is null) as inserts,
+        count(*) filter (
+            where paired.existing_ctid is not null and {form_replaced_record_change_sql(update_columns, target_columns)}
+        ) as updates,
+        {deletes if remove_unmatched else "0"} as deletes
+    from paired
+    left join public.{output_map[table]} as target
+        on target.crash_id = any(%(crash_ids)s) and target.ctid = paired.existing_ctid
+    """
+    return sql
+
+
+def get_replacement_counts(pg, counts_query, crash_ids):
+    # the number of crashes whose records are replaced, and how many records that inserts, updates and deletes
+    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor.execute(counts_query, {"crash_ids": list(crash_ids)})
+    return dict(cursor.fetchone())
+
+
+def get_replaceable_crash_ids(
+    pg,
+    output_map,
+    table,
+    diff_query,
+    linkage_clauses,
+    important_column_comparisons,
+    DB_IMPORT_SCHEMA,
+    held_crash_ids=(),
+):
+    # The crashes of an import table whose VZDB records can be replaced in bulk, as a dictionary of whether each has
+    # any VZDB records. Only crashes with an imported record which is new or differs from its VZDB record are replaced.
+    # A crash is held back, to be reconciled record by record, when it has a pending change record, is among the
+    # crashes given, has a VZDB record whose protected columns differ from the imported record with its key, or has a
+    # VZDB record CRIS didn't send, which could have been added by hand.
+    important_comparison_sql = " and ".join(important_column_comparisons) or "true"
+    sql = f"""
+    with changed as (
+        select crash_id from ({diff_query}) as differences
+        where not target_exists or not skip_update
+    ),
+    held as (
+        select public.{output_map[table]}.crash_id
+        from public.{output_map[table]}
+        join {DB_IMPORT_SCHEMA}.{table} on ({" and ".join(linkage_clauses)})
+        where not coalesce(({important_comparison_sql}), false)
+        union
+        select public.{output_map[table]}.crash_id
+        from public.{output_map[table]}
+        where public.{output_map[table]}.crash_id in (select crash_id from {DB_IMPORT_SCHEMA}.{table})
+        and not exists (
+            select 1 from {DB_IMPORT_SCHEMA}.{table}
+            where {" and ".join(linkage_clauses)}
+        )
+        union
+        select record_id from public.atd_txdot_changes where status_id = 0
+        union
+        select crash_id from {DB_IMPORT_SCHEMA}.{table} where crash_id = any(%(held_crash_ids)s)
+    ),
+    replaceable as (
+        select crash_id from changed
+        except
+        select crash_id from held
+    )
+    select replaceable.crash_id, exists (
+        select 1 from public.{output_map[table]}
+        where public.{output_map[table]}.crash_id = replaceable.crash_id
+    ) as target_exists
+    from replaceable
+    """
+    cursor = pg.cursor()
+    cursor.execute(sql, {"held_crash_ids": list(held_crash_ids)})
+    return dict(cursor.fetchall())
+
+
+def remove_import_records(pg, DB_IMPORT_SCHEMA, table, crash_ids):
+    # takes the records of crashes which have been dealt with out of an import table, so the rest can be reconciled
+    cursor = pg.cursor()
+    cursor.execute(
+        f"delete from {DB_IMPORT_SCHEMA}.{table} where crash_id = any(%(crash_ids)s)",
+        {"crash_ids": list(crash_ids)},
+    )
+    pg.commit()
+
+
+def identify_as_cris_import(pg):
+    # Updates made by other sessions clear a record's cris_row_hash, see the trigger added with the column
+    cursor = pg.cursor()
+    cursor.execute("select set_config('vz.cris_import', 'true', false)")
+
+
+def get_existing_change_record_ids(pg, record_ids):
+    sql = f"""
+    select distinct record_id
+    from atd_txdot_changes_view
+    where record_id = any(%(record_ids)s)
+    """
+
+    cursor = pg.cursor()
+    cursor.execute(sql, {"record_ids": [int(record_id) for record_id in record_ids]})
+    return {row[0] for row in cursor.fetchall()}
+
+
+def get_temporary_records(pg, DB_IMPORT_SCHEMA):
+    # Temporary records are crashes entered by hand, with crash IDs below 10000, before CRIS delivers them. They
+    # are found for every imported crash at once, by their case IDs, as a dictionary of their crash IDs by case ID.
+    crash_columns = get_catalog(pg, DB_IMPORT_SCHEMA).table_columns(
+        DB_IMPORT_SCHEMA, "crash"
+    )
+    if "case_id" not in [column["column_name"] for column in crash_columns]:
+        return {}
+
+    sql = f"""
+    select distinct public.atd_txdot_crashes.crash_id, public.atd_txdot_crashes.case_id::text
+    from public.atd_txdot_crashes
+    join {DB_IMPORT_SCHEMA}.crash
+        on {DB_IMPORT_SCHEMA}.crash.case_id::text = public.atd_txdot_crashes.case_id::text
+    where public.atd_txdot_crashes.crash_id < 10000
+    order by 1
+    """
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    temporary_records = {}
+    for crash_id, case_id in cursor.fetchall():
+        temporary_records.setdefault(case_id, []).append(crash_id)
+    return temporary_records
+
+
+def remove_temporary_records(pg, case_ids):
+    # returns the records which were deleted, to be kept as an audit trail
+    if not case_ids:
+        return []
+    sql = """
     delete from atd_txdot_crashes
     where crash_id < 10000
-    and case_id = '{case_id}'
+    and case_id::text = any(%(case_ids)s)
+    returning crash_id, case_id
     """
     cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
-    return True
+    cursor.execute(sql, {"case_ids": list(case_ids)})
+    return [dict(record) for record in cursor.fetchall()]
+
+
+class StatementBatch:
+    """
+    Runs the INSERT and UPDATE statements of an import in transactions of `batch_size` statements, rather than
+    committing each one. Every statement gets its own SAVEPOINT, so a statement which fails is rolled back on its
+    own and the rest of the batch carries on. The failures are kept in `failures` to be reported at the end of the run.
+    """
+
+    def __init__(self, pg, batch_size=500):
+        self.pg = pg
+        self.batch_size = batch_size
+        self.pending = 0
+        self.executed = 0
+        self.commits = 0
+        self.failures = []
+
+    def execute(self, run, failure):
+        cursor = self.pg.cursor()
+        cursor.execute("SAVEPOINT cris_import_statement")
+        try:
+            run()
+        except psycopg2.Error as error:
+            cursor.execute("ROLLBACK TO SAVEPOINT cris_import_statement")
+            failure["error"] = str(error).strip()
+            failure["sqlstate"] = error.pgcode
+            self.failures.append(failure)
+            return False
+        cursor.execute("RELEASE SAVEPOINT cris_import_statement")
+
+        self.executed += 1
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+        return True
+
+    def commit(self):
+        self.pg.commit()
+        if self.pending:
+            self.commits += 1
+        self.pending = 0
 
+    def summary(self):
+        return {
+            "statements": self.executed,
+            "commits": self.commits,
+            "failures": len(self.failures),
+        }
 
-def try_statement(pg, output_map, table, public_key_sql, sql, dry_run):
+
+def try_statement(
+    pg,
+    output_map,
+    table,
+    public_key_sql,
+    sql,
+    dry_run,
+    key_values=None,
+    statements=None,
+    parameter_types=None,
+    batch=None,
+):
     if dry_run:
         print("Dry run; skipping")
         return
+
+    def run():
+        if statements:
+            statements.execute(sql, key_values, parameter_types)
+        else:
+            cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(sql, key_values)
+
+    if batch:
+        failure = {
+            "table": output_map[table],
+            "where": public_key_sql,
+            "key_values": key_values,
+            "sql": sql,
+        }
+        if not batch.execute(run, failure):
+            print(
+                f"Statement failed in {output_map[table]} for {key_values or public_key_sql}: {failure['error']}"
+            )
+        return
+
     try:
-        cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute(sql)
+        run()
         pg.commit()
     except Exception as error:
+        # leave the connection usable for the statements which follow
+        pg.rollback()
         print(
-            f"There is likely an issue with existing data. Try looking for results in {output_map[table]} with the following WHERE clause:\n'{public_key_sql}'"
+            f"There is likely an issue with existing data. Try looking for results in {output_map[table]} with the following WHERE clause:\n'{public_key_sql}' {key_values or ''}"
         )
         print(f"Error executing:\n\n{sql}\n")
         print("\a")  # 🛎
 
 
-def get_input_column_names(pg, DB_IMPORT_SCHEMA, table, target_columns):
-    sql = f"""
-    SELECT
-        column_name,
-        data_type,
-        character_maximum_length AS max_length,
-        character_octet_length AS octet_length
-    FROM
-        information_schema.columns
-    WHERE true
-        AND table_schema = '{DB_IMPORT_SCHEMA}'
-        AND table_name = '{table}'
+class CatalogSnapshot:
+    """
+    A copy of the part of the system catalog the import consults: the columns, and their types, of every table in
+    the public schema and in the import schemas of the run. It's read from pg_attribute and pg_class, which is much
+    faster than information_schema on a database with many schemas, and each schema is read once, all of its tables
+    in one query. Nothing but DDL changes the catalog, so a schema is only read again once the import has changed
+    its tables and called invalidate_catalog().
     """
 
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
-    input_table_column_types = cursor.fetchall()
+    def __init__(self):
+        self.schemas = set()
+        self.columns = {}
+
+    def load(self, pg, schemas):
+        # the type names are those of information_schema.columns.data_type, other than for arrays and user-defined types
+        sql = """
+        SELECT
+            namespaces.nspname AS table_schema,
+            tables.relname AS table_name,
+            columns.attname AS column_name,
+            columns.attnum AS ordinal_position,
+            format_type(
+                case when types.typtype = 'd' then types.typbasetype else columns.atttypid end, null
+            ) AS data_type,
+            case
+                when columns.atttypid in ('bpchar'::regtype, 'varchar'::regtype) and columns.atttypmod > 0
+                then columns.atttypmod - 4
+            end AS max_length,
+            columns.attgenerated <> '' AS is_generated,
+            NOT columns.attnotnull AS is_nullable,
+            -- as in information_schema, the expression of a generated column isn't its default
+            case when columns.attgenerated = '' then pg_get_expr(defaults.adbin, defaults.adrelid) end AS column_default
+        FROM pg_attribute AS columns
+            JOIN pg_class AS tables ON tables.oid = columns.attrelid
+            JOIN pg_namespace AS namespaces ON namespaces.oid = tables.relnamespace
+            JOIN pg_type AS types ON types.oid = columns.atttypid
+            LEFT JOIN pg_attrdef AS defaults
+                ON defaults.adrelid = columns.attrelid AND defaults.adnum = columns.attnum
+        WHERE true
+            AND namespaces.nspname = ANY(%(schemas)s)
+            AND tables.relkind in ('r', 'p', 'v', 'm', 'f')
+            AND columns.attnum > 0
+            AND NOT columns.attisdropped
+        ORDER BY tables.relname, columns.attnum
+        """
+
+        cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(sql, {"schemas": list(schemas)})
+        for schema in schemas:
+            self.forget(schema)
+            self.schemas.add(schema)
+        for column in cursor.fetchall():
+            column = dict(column)
+            key = (column.pop("table_schema"), column["table_name"])
+            self.columns.setdefault(key, []).append(column)
+
+    def forget(self, schema):
+        self.schemas.discard(schema)
+        for key in [key for key in self.columns if key[0] == schema]:
+            del self.columns[key]
+
+    def tables(self, schema):
+        return [table for table_schema, table in self.columns if table_schema == schema]
+
+    def table_columns(self, schema, table):
+        return self.columns.get((schema, table), [])
+
+
+CATALOG = CatalogSnapshot()
+
+
+def get_catalog(pg, *schemas):
+    # schemas are read the first time they're needed; those missing from the snapshot are read in one query
+    missing_schemas = [schema for schema in schemas if schema not in CATALOG.schemas]
+    if missing_schemas:
+        CATALOG.load(pg, missing_schemas)
+    return CATALOG
+
+
+def invalidate_catalog(DB_IMPORT_SCHEMA):
+    # called after the tables of an import schema are created, altered or dropped, for the schema to be read again
+    CATALOG.forget(DB_IMPORT_SCHEMA)
+
+
+def get_input_column_names(pg, DB_IMPORT_SCHEMA, table, target_columns):
+    input_table_column_types = get_catalog(pg, DB_IMPORT_SCHEMA).table_columns(
+        DB_IMPORT_SCHEMA, table
+    )
 
     # TODO figure out how to .map() this
     input_column_names = []
@@ -304,32 +1313,39 @@ def get_input_column_names(pg, DB_IMPORT_SCHEMA, table, target_columns):
 
 
 def get_target_columns(pg, output_map, table):
-    sql = f"""
-    SELECT
-        column_name,
-        data_type,
-        character_maximum_length AS max_length,
-        character_octet_length AS octet_length
-    FROM
-        information_schema.columns
-    WHERE true
-        AND table_schema = 'public'
-        AND table_name = '{output_map[table]}'
-    """
-
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
-    target_columns = cursor.fetchall()
+    target_columns = get_catalog(pg, "public").table_columns(
+        "public", output_map[table]
+    )
     return target_columns
 
 
-def load_input_data_for_keying(pg, DB_IMPORT_SCHEMA, table):
-    sql = f"select * from {DB_IMPORT_SCHEMA}.{table}"
+def load_input_data_for_keying(pg, DB_IMPORT_SCHEMA, table, key_columns, itersize=2000):
+    # Only the key columns and the location of each row are streamed, `itersize` rows at a time. The few records
+    # which are needed in full, such as conflicts, are fetched by their location with fetch_import_record().
+    columns = [f"{DB_IMPORT_SCHEMA}.{table}.{key}" for key in key_columns]
+    columns.append(f"{DB_IMPORT_SCHEMA}.{table}.ctid::text as import_ctid")
+    sql = f"select {', '.join(columns)} from {DB_IMPORT_SCHEMA}.{table} "
+    sql += get_record_ordering(key_columns, table, DB_IMPORT_SCHEMA)
 
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor = pg.cursor(
+        name=f"imported_records_{table}",
+        cursor_factory=psycopg2.extras.RealDictCursor,
+        withhold=True,
+    )
+    cursor.itersize = itersize
     cursor.execute(sql)
-    imported_records = cursor.fetchall()
-    return imported_records
+    try:
+        for imported_record in cursor:
+            yield imported_record
+    finally:
+        cursor.close()
+
+
+def fetch_import_record(pg, DB_IMPORT_SCHEMA, table, import_ctid):
+    sql = f"select * from {DB_IMPORT_SCHEMA}.{table} where ctid = %(import_ctid)s::tid"
+    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor.execute(sql, {"import_ctid": import_ctid})
+    return cursor.fetchone()
 
 
 def get_linkage_constructions(key_columns, output_map, table, DB_IMPORT_SCHEMA):
@@ -343,13 +1359,42 @@ def get_linkage_constructions(key_columns, output_map, table, DB_IMPORT_SCHEMA):
 
 
 def get_imported_tables(pg, DB_IMPORT_SCHEMA):
-    sql = f"SELECT * FROM information_schema.tables WHERE table_schema = '{DB_IMPORT_SCHEMA}';"
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
-    imported_tables = cursor.fetchall()
+    imported_tables = [
+        {"table_schema": DB_IMPORT_SCHEMA, "table_name": table}
+        for table in get_catalog(pg, DB_IMPORT_SCHEMA).tables(DB_IMPORT_SCHEMA)
+    ]
     return imported_tables
 
 
+def get_imported_crash_ids(pg, DB_IMPORT_SCHEMA, tables):
+    imported_tables = [
+        imported_table["table_name"]
+        for imported_table in get_imported_tables(pg, DB_IMPORT_SCHEMA)
+        if imported_table["table_name"] in tables
+    ]
+    if not imported_tables:
+        return set()
+    sql = " union ".join(
+        f"select crash_id::integer from {DB_IMPORT_SCHEMA}.{table}"
+        for table in imported_tables
+    )
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def get_import_table_row_counts(pg, DB_IMPORT_SCHEMA, tables):
+    if not tables:
+        return {}
+    sql = " union all ".join(
+        f"select '{table}' as table_name, count(*) as row_count from {DB_IMPORT_SCHEMA}.{table}"
+        for table in tables
+    )
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    return {table_name: row_count for table_name, row_count in cursor.fetchall()}
+
+
 def enforce_complete_keying(
     pg, key_columns, output_table, DB_IMPORT_SCHEMA, input_table
 ):
@@ -359,93 +1404,91 @@ def enforce_complete_keying(
     sql = f"delete from {DB_IMPORT_SCHEMA}.{input_table['table_name']}"
     clauses = []
     for key in keys:
-        clauses.append(f"{key} ~ '^\s*$'")
+        clauses.append(f"{key} is null or {key} ~ '^\s*$'")
     sql += " where (" + " or ".join(clauses) + ")"
 
     cursor = pg.cursor()
     cursor.execute(sql)
     pg.commit()
+    return cursor.rowcount
+
+
+def get_column_types_to_align(pg, DB_IMPORT_SCHEMA, table_mappings):
+    # the VZDB column types of every column which appears in both an import table and its target table,
+    # in the order of the target table's columns
+    catalog = get_catalog(pg, "public", DB_IMPORT_SCHEMA)
+    column_types = {}
+    for input_table, output_table in table_mappings.items():
+        input_column_names = {
+            column["column_name"]
+            for column in catalog.table_columns(DB_IMPORT_SCHEMA, input_table)
+        }
+        for column in catalog.table_columns("public", output_table):
+            if column["column_name"] in input_column_names:
+                column_types.setdefault(input_table, []).append(
+                    {**column, "table_name": input_table}
+                )
+    return column_types
 
 
-def get_output_column_types(pg, output_table):
-    # This is a subtle SQL injection attack vector.
-    # Beware the f-string. But I trust CRIS.
-    sql = f"""
-    SELECT
-        column_name,
-        data_type,
-        character_maximum_length AS max_length,
-        character_octet_length AS octet_length
-    FROM
-        information_schema.columns
-    WHERE true
-        AND table_schema = 'public'
-        AND table_name = '{output_table}'
-    """
-
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
-    output_column_types = cursor.fetchall()
-    return output_column_types
+def get_input_tables_and_columns(pg, DB_IMPORT_SCHEMA):
+    catalog = get_catalog(pg, DB_IMPORT_SCHEMA)
+    input_tables_and_columns = []
+    for table in catalog.tables(DB_IMPORT_SCHEMA):
+        input_tables_and_columns += catalog.table_columns(DB_IMPORT_SCHEMA, table)
+    return input_tables_and_columns
 
 
-def get_input_column_type(pg, DB_IMPORT_SCHEMA, input_table, column):
+def create_import_table(pg, DB_IMPORT_SCHEMA, table, columns):
+    fields = ",\n".join(f"       {column} character varying" for column in columns)
     sql = f"""
-    SELECT
-        column_name,
-        data_type,
-        character_maximum_length AS max_length,
-        character_octet_length AS octet_length
-    FROM
-        information_schema.columns
-    WHERE true
-        AND table_schema = '{DB_IMPORT_SCHEMA}'
-        AND table_name = '{input_table["table_name"]}'
-        AND column_name = '{column["column_name"]}'
+    drop table if exists {DB_IMPORT_SCHEMA}.{table};
+    create table {DB_IMPORT_SCHEMA}.{table} (
+{fields}
+    );
     """
-
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor = pg.cursor()
     cursor.execute(sql)
-    input_column_type = cursor.fetchall()
-    return input_column_type
-
 
-def get_input_tables_and_columns(pg, DB_IMPORT_SCHEMA):
-    sql = f"""
-    SELECT
-        table_name,
-        column_name,
-        data_type,
-        character_maximum_length AS max_length,
-        character_octet_length AS octet_length
-    FROM
-        information_schema.columns
-    WHERE true
-        AND table_schema = '{DB_IMPORT_SCHEMA}'
-    """
 
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cursor.execute(sql)
-    input_tables_and_columns = cursor.fetchall()
-    return input_tables_and_columns
+def copy_into_import_table(pg, DB_IMPORT_SCHEMA, table, columns, stream):
+    # empty fields are loaded as empty strings rather than nulls, as pgloader loads them
+    column_list = ", ".join(columns)
+    sql = f"copy {DB_IMPORT_SCHEMA}.{table} ({column_list}) from stdin with (format csv, force_not_null ({column_list}))"
+    cursor = pg.cursor()
+    cursor.copy_expert(sql, stream, size=65536)
+    pg.commit()
 
 
-def trim_trailing_carriage_returns(pg, DB_IMPORT_SCHEMA, column):
-    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+def trim_trailing_carriage_returns(pg, DB_IMPORT_SCHEMA, table, columns):
+    # one pass over the table for all of its columns, only rewriting the rows which need it
+    assignments = ",\n        ".join(
+        f"{column} = regexp_replace({column}, '[\\n\\r]*$', '', 'g')"
+        for column in columns
+    )
+    conditions = "\n        or ".join(f"{column} ~ '[\\n\\r]$'" for column in columns)
     sql = f"""
-    update {DB_IMPORT_SCHEMA}.{column["table_name"]}
-    set {column["column_name"]} = regexp_replace({column["column_name"]}, '[\\n\\r]*$', '', 'g')
+    update {DB_IMPORT_SCHEMA}.{table}
+    set {assignments}
+    where {conditions}
     """
+    cursor = pg.cursor()
     cursor.execute(sql)
     pg.commit()
+    return cursor.rowcount
 
 
-def form_alter_statement_to_apply_column_typing(DB_IMPORT_SCHEMA, input_table, column):
+def form_alter_statement_to_apply_table_typing(DB_IMPORT_SCHEMA, input_table, columns):
     # the `USING` hackery is due to the reality of the CSV null vs "" confusion
-    return f"""
-            ALTER TABLE {DB_IMPORT_SCHEMA}.{input_table["table_name"]}
+    clauses = ",\n".join(
+        f"""
             ALTER COLUMN {column["column_name"]} SET DATA TYPE {column["data_type"]}
-            USING case when {column["column_name"]} = \'\' then null else {column["column_name"]}::{column["data_type"]} end
+            USING case when {column["column_name"]} = \'\' then null else {column["column_name"]}::{column["data_type"]} end"""
+        for column in columns
+    )
+    # all of the columns are retyped in one statement, so the table is only rewritten once
+    return f"""
+            ALTER TABLE {DB_IMPORT_SCHEMA}.{input_table["table_name"]}{clauses}
             """
 
 
@@ -457,6 +1500,7 @@ def show_changed_values(
     linkage_clauses,
     record_key_sql,
     DB_IMPORT_SCHEMA,
+    key_values,
 ):
     for column in changed_columns["changed_columns"]:
         print(column)
@@ -469,7 +1513,7 @@ def show_changed_values(
             where {record_key_sql}
             """
         cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute(sql)
+        cursor.execute(sql, key_values)
         values = cursor.fetchone()
 
         if values[f"import_{column}"]:
@@ -478,6 +1522,47 @@ def show_changed_values(
             values[f"import_{column}"] = values[f"import_{column}"].replace("\r", "\\r")
 
         print(f"Column update for {column} in {table}:")
-        print(f"  entity: {record_key_sql}")
+        print(f"  entity: {key_values}")
         print(f"  import: '{values[f'import_{column}']}'")
         print(f"  public: '{values[f'public_{column}']}'")
+
+
+def get_extract_columns(pg, output_table):
+    # the columns of a VZDB table which can come from CRIS, leaving out generated columns, serial IDs and the
+    # hash the import stores of each record
+    return [
+        column["column_name"]
+        for column in get_catalog(pg, "public").table_columns("public", output_table)
+        if not column["is_generated"]
+        and not (column["column_default"] or "").startswith("nextval(")
+        and column["column_name"] != "cris_row_hash"
+    ]
+
+
+def sample_crash_ids(pg, count, rng):
+    # the crashes are picked by the caller's random number generator, so a seeded one picks the same crashes again
+    sql = "select crash_id from public.atd_txdot_crashes order by crash_id"
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    crash_ids = [row[0] for row in cursor.fetchall()]
+    return rng.sample(crash_ids, min(count, len(crash_ids)))
+
+
+def get_max_crash_id(pg):
+    cursor = pg.cursor()
+    cursor.execute("select coalesce(max(crash_id), 0) from public.atd_txdot_crashes")
+    return cursor.fetchone()[0]
+
+
+def load_crash_records_as_text(pg, output_table, columns, crash_ids):
+    # Every value is rendered as text by the database, so it reads back in unchanged when imported
+    column_sql = ", ".join([f"{column}::text as {column}" for column in columns])
+    sql = f"""
+    select crash_id as source_crash_id, {column_sql}
+    from public.{output_table}
+    where crash_id = any(%(crash_ids)s)
+    """
+
+    cursor = pg.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cursor.execute(sql, {"crash_ids": list(crash_ids)})
+    return cursor.fetchall()
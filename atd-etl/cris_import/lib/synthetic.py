@@ -0,0 +1,174 @@
+import csv
+import glob
+import os
+import random
+import subprocess
+
+import lib.mappings as mappings
+import lib.sql as util
+
+# The tables of a CRIS extract and the VZDB tables they are written from
+EXTRACT_TABLES = mappings.get_table_map()
+
+# The column of each table which is changed to make a record an update. These are the same columns
+# lib/testing.py changes, and none of them are protected from updates.
+UPDATED_COLUMNS = {
+    "atd_txdot_crashes": "rpt_street_name",
+    "atd_txdot_units": "vin",
+    "atd_txdot_person": "prsn_last_name",
+    "atd_txdot_primaryperson": "prsn_last_name",
+}
+
+# The column of each table, from its no_override_columns, which is changed to make a record a conflict
+CONFLICTING_COLUMNS = {
+    "atd_txdot_crashes": "crash_speed_limit",
+    "atd_txdot_units": "movement_id",
+    "atd_txdot_person": "prsn_age",
+    "atd_txdot_primaryperson": "prsn_age",
+}
+
+
+def write_synthetic_extract(
+    pg,
+    directory,
+    crashes,
+    overlap_fraction=0.9,
+    update_fraction=0.2,
+    conflict_fraction=0.02,
+    malformed_fraction=0.0,
+    groups=1,
+    seed=None,
+):
+    """
+    Write CSVs shaped like a CRIS extract, built from crashes already in the VZDB. A fraction of the crashes
+    are existing ones. Most of those are written back unchanged, some with a change to an unprotected column,
+    which the import applies as an update, and some with a protected column changed as well, which it sends
+    on as a conflict. The rest are copies of existing crashes under new crash IDs, which the import inserts.
+    Every crash comes with its units, people, primary people and charges, and a fraction of the records can
+    be repeated with a blank key column, for the import to drop.
+
+    Arguments:
+        pg: A psycopg2 connection to the database the extract is meant for
+        directory: The directory to write the CSVs into
+        crashes: The number of crashes in the extract
+        overlap_fraction: The fraction of the crashes which already exist in the VZDB
+        update_fraction: The fraction of the crashes which are updates
+        conflict_fraction: The fraction of the crashes which are conflicts
+        malformed_fraction: The fraction of the records which are repeated with a blank key column
+        groups: The number of logical groups to spread the crashes across
+        seed: Seed of the random choices and of the logical group IDs, to write the same extract again
+
+    Returns: A dictionary of the number of crashes planned as each outcome, and of malformed records
+    """
+
+    rng = random.Random(seed)
+
+    existing_count = round(crashes * overlap_fraction)
+    existing_crash_ids = util.sample_crash_ids(pg, max(existing_count, 1), rng)
+    if not existing_crash_ids:
+        raise Exception("The database holds no crashes to base a synthetic extract on")
+
+    # which crash each crash of the extract is copied from, the crash ID it is written with, and how it's changed
+    conflict_count = round(crashes * conflict_fraction)
+    update_count = round(crashes * update_fraction)
+    overlapping_crash_ids = existing_crash_ids[:existing_count]
+    outcomes = (
+        ["conflict"] * conflict_count
+        + ["update"] * update_count
+        + ["no_op"] * max(len(overlapping_crash_ids) - conflict_count - update_count, 0)
+    )[: len(overlapping_crash_ids)]
+    rng.shuffle(outcomes)
+    plan = list(zip(overlapping_crash_ids, overlapping_crash_ids, outcomes))
+
+    next_crash_id = util.get_max_crash_id(pg) + 1
+    for index in range(crashes - len(plan)):
+        template_crash_id = rng.choice(existing_crash_ids)
+        plan.append((template_crash_id, next_crash_id + index, "insert"))
+
+    # the logical groups are named after an extract timestamp, which is drawn from the seed too, so that a seeded
+    # extract is written to the same CSVs
+    extract_timestamp = rng.randrange(1_500_000_000, 2_000_000_000)
+    group_ids = [f"{extract_timestamp}_{number}" for number in range(1, groups + 1)]
+    source_crash_ids = {source_crash_id for source_crash_id, _, _ in plan}
+
+    planned = {outcome: 0 for outcome in ["insert", "update", "conflict", "no_op"]}
+    for _, _, outcome in plan:
+        planned[outcome] += 1
+    planned["malformed_records"] = 0
+
+    for table, output_table in EXTRACT_TABLES.items():
+        columns = util.get_extract_columns(pg, output_table)
+        key_columns = mappings.get_key_columns()[output_table]
+
+        records = {}
+        for record in util.load_crash_records_as_text(
+            pg, output_table, columns, source_crash_ids
+        ):
+            records.setdefault(record.pop("source_crash_id"), []).append(record)
+
+        files = [
+            open(f"{directory}/extract_{group_id}_{table}_1.csv", "w", newline="")
+            for group_id in group_ids
+        ]
+        try:
+            writers = [csv.DictWriter(file, fieldnames=columns) for file in files]
+            for writer in writers:
+                writer.writeheader()
+
+            for index, (source_crash_id, crash_id, outcome) in enumerate(plan):
+                writer = writers[index % groups]
+                for record in records.get(source_crash_id, []):
+                    record = synthesize_record(record, output_table, crash_id, outcome)
+                    writer.writerow(record)
+
+                    if rng.random() < malformed_fraction:
+                        # a blank or empty key, which the import finds and drops before aligning the table
+                        writer.writerow(
+                            {**record, rng.choice(key_columns): rng.choice([" ", ""])}
+                        )
+                        planned["malformed_records"] += 1
+        finally:
+            for file in files:
+                file.close()
+
+    print(f"Wrote a synthetic extract of {crashes} crashes to {directory}: {planned}")
+    return planned
+
+
+def synthesize_record(record, output_table, crash_id, outcome):
+    record = dict(record)
+    record["crash_id"] = str(crash_id)
+
+    # A record whose only changes are to protected columns is left alone by the import, so a conflicting
+    # record changes an unprotected column as well
+    if outcome == "conflict" and output_table in CONFLICTING_COLUMNS:
+        column = CONFLICTING_COLUMNS[output_table]
+        record[column] = str(int(record[column] or 0) + 5)
+
+    if outcome in ("update", "conflict") and output_table in UPDATED_COLUMNS:
+        # swap the last character, so the value still fits its column
+        column = UPDATED_COLUMNS[output_table]
+        value = record[column] or ""
+        record[column] = value[:-1] + ("Y" if value.endswith("X") else "X")
+
+    return record
+
+
+def pack_extract(directory, archive, password):
+    """
+    Pack the CSVs of an extract into a password protected zip archive with 7-Zip, like the ones CRIS
+    delivers to the SFTP endpoint
+
+    Arguments:
+        directory: The directory holding the CSVs
+        archive: Path of the archive to write
+        password: The password to encrypt the archive with
+
+    Returns: The path of the archive
+    """
+
+    csvs = sorted(glob.glob(os.path.join(directory, "extract_*.csv")))
+    command = ["7za", "a", "-tzip", f"-p{password}", "-mem=AES256", archive] + csvs
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    print(f"Packed {len(csvs)} CSVs into {archive}")
+    return archive
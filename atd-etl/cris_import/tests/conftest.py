@@ -0,0 +1,58 @@
+import os
+import sys
+import uuid
+
+import psycopg2
+import pytest
+
+# the tests import the import's modules the way cris_import.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.sql as util
+from lib.instrumentation import CountingConnection
+
+# The tests which need a database create one of their own on this server, and drop it when they're done
+TEST_DB_HOST = os.environ.get("CRIS_IMPORT_TEST_DB_HOST", "localhost")
+TEST_DB_PORT = os.environ.get("CRIS_IMPORT_TEST_DB_PORT", "5432")
+TEST_DB_USER = os.environ.get("CRIS_IMPORT_TEST_DB_USER", "postgres")
+TEST_DB_PASSWORD = os.environ.get("CRIS_IMPORT_TEST_DB_PASSWORD", "")
+
+
+def connect(dbname):
+    return psycopg2.connect(
+        host=TEST_DB_HOST,
+        port=TEST_DB_PORT,
+        user=TEST_DB_USER,
+        password=TEST_DB_PASSWORD,
+        dbname=dbname,
+        # as in the import's connection pools, so the tests can see which helpers sent which queries
+        connection_factory=CountingConnection,
+    )
+
+
+@pytest.fixture
+def pg():
+    """
+    A connection to a throwaway database, which is dropped after the test. Tests which use it are skipped when
+    the server isn't reachable.
+    """
+
+    try:
+        server = connect("postgres")
+    except psycopg2.OperationalError as error:
+        pytest.skip(f"No database server to test against: {error}")
+    server.autocommit = True
+    dbname = f"cris_import_test_{uuid.uuid4().hex[:12]}"
+    server.cursor().execute(f"create database {dbname}")
+
+    connection = connect(dbname)
+    try:
+        yield connection
+    finally:
+        connection.close()
+        # the catalog snapshot and the table plans describe the database being dropped
+        for schema in list(util.CATALOG.schemas):
+            util.CATALOG.forget(schema)
+        util.TABLE_PLANS.clear()
+        server.cursor().execute(f"drop database {dbname}")
+        server.close()
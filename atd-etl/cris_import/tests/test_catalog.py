@@ -0,0 +1,67 @@
+import lib.instrumentation as instrumentation
+import lib.sql as util
+from vzdb import IMPORT_SCHEMA, fetch
+
+
+def test_the_snapshot_matches_information_schema(pg):
+    pg.cursor().execute(
+        f"""
+        create domain crash_speed as integer;
+        create table atd_txdot_crashes (
+            crash_id serial primary key, case_id varchar(32), rpt_street_name text not null default '',
+            crash_speed_limit crash_speed, latitude_primary double precision, crash_date date,
+            crash_year integer generated always as (extract(year from crash_date)) stored
+        );
+        create schema {IMPORT_SCHEMA};
+        create table {IMPORT_SCHEMA}.crash (crash_id varchar, case_id varchar);
+        """
+    )
+    pg.commit()
+    instrumentation.take_query_stats()
+
+    # both schemas are read in one query, and not read again
+    catalog = util.get_catalog(pg, "public", IMPORT_SCHEMA)
+    util.get_catalog(pg, "public", IMPORT_SCHEMA)
+    assert len(instrumentation.take_query_stats()["timings"]["get_catalog"]) == 1
+
+    assert [
+        (
+            column["column_name"],
+            column["ordinal_position"],
+            column["data_type"],
+            column["max_length"],
+            "ALWAYS" if column["is_generated"] else "NEVER",
+            column["column_default"],
+            "YES" if column["is_nullable"] else "NO",
+        )
+        for column in catalog.table_columns("public", "atd_txdot_crashes")
+    ] == fetch(
+        pg,
+        """
+        select column_name, ordinal_position, data_type, character_maximum_length, is_generated, column_default,
+            is_nullable
+        from information_schema.columns
+        where table_schema = 'public' and table_name = 'atd_txdot_crashes'
+        order by ordinal_position
+        """,
+    )
+    assert catalog.tables(IMPORT_SCHEMA) == ["crash"]
+    assert util.get_extract_columns(pg, "atd_txdot_crashes") == [
+        "case_id",
+        "rpt_street_name",
+        "crash_speed_limit",
+        "latitude_primary",
+        "crash_date",
+    ]
+
+    # once the import schema changes, it's read again
+    pg.cursor().execute(
+        f"alter table {IMPORT_SCHEMA}.crash add column crash_date varchar"
+    )
+    util.invalidate_catalog(IMPORT_SCHEMA)
+    assert [
+        column["column_name"]
+        for column in util.get_catalog(pg, IMPORT_SCHEMA).table_columns(
+            IMPORT_SCHEMA, "crash"
+        )
+    ] == ["crash_id", "case_id", "crash_date"]
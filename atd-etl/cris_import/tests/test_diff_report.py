@@ -0,0 +1,82 @@
+import csv
+
+import pytest
+
+from lib.diffreport import COLUMNS, DiffReport
+
+RECORDS = [
+    ("atd_txdot_crashes", {"crash_id": 1}, ["crash_id"], "insert", (), ()),
+    (
+        "atd_txdot_crashes",
+        {"crash_id": 2},
+        ["crash_id"],
+        "conflict",
+        ("rpt_street_name",),
+        ("crash_speed_limit",),
+    ),
+    (
+        "atd_txdot_units",
+        {"crash_id": 2, "unit_nbr": 1},
+        ["crash_id", "unit_nbr"],
+        "update",
+        ("vin", "veh_mod_year"),
+        (),
+    ),
+    (
+        "atd_txdot_charges",
+        {"crash_id": 3, "prsn_nbr": 1},
+        ["crash_id"],
+        "replace",
+        (),
+        (),
+    ),
+]
+
+ROWS = [
+    ["atd_txdot_crashes", "1", '{"crash_id": 1}', "insert", "", ""],
+    [
+        "atd_txdot_crashes",
+        "2",
+        '{"crash_id": 2}',
+        "conflict",
+        "rpt_street_name",
+        "crash_speed_limit",
+    ],
+    [
+        "atd_txdot_units",
+        "2",
+        '{"crash_id": 2, "unit_nbr": 1}',
+        "update",
+        "vin,veh_mod_year",
+        "",
+    ],
+    ["atd_txdot_charges", "3", '{"crash_id": 3}', "replace", "", ""],
+]
+
+
+def write_report(path, format):
+    # a chunk smaller than the report, so it's written out more than once
+    with DiffReport(path, format, chunk_size=3) as report:
+        for record in RECORDS:
+            report.write(*record)
+    return report
+
+
+def test_a_csv_report_has_a_row_per_record(tmp_path):
+    path = str(tmp_path / "report.csv")
+
+    assert write_report(path, "csv").rows == 4
+
+    with open(path, newline="") as file:
+        assert list(csv.reader(file)) == [COLUMNS] + ROWS
+
+
+def test_a_parquet_report_has_a_row_per_record(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "report.parquet")
+
+    write_report(path, "parquet")
+
+    table = parquet.read_table(path)
+    assert table.column_names == COLUMNS
+    assert [[str(value) for value in row.values()] for row in table.to_pylist()] == ROWS
@@ -0,0 +1,91 @@
+import json
+
+import lib.instrumentation as instrumentation
+import lib.sql as util
+
+
+def imported_group(logical_group_id, inserts, updates, seconds):
+    return {
+        "logical_group_id": logical_group_id,
+        "import_schema": f"import_{logical_group_id}",
+        "stages": {"align_records": {"seconds": seconds, "rows": inserts + updates}},
+        "table_outcomes": {
+            "atd_txdot_crashes": {"inserts": inserts, "updates": updates}
+        },
+    }
+
+
+def test_the_run_report_adds_up_the_logical_groups(tmp_path):
+    instrumentation.take_query_stats()
+    report = instrumentation.RunReport()
+    with report.stage("unzip_archives") as metrics:
+        metrics["archives"] = 2
+
+    report.add_logical_groups(
+        [imported_group("1_1", 3, 1, 0.5), imported_group("1_2", 2, 0, 0.25)]
+    )
+    report.totals["cr3s_queued"] = 1
+    report.write(str(tmp_path / "report.json"))
+    report.append_to_metrics_file(str(tmp_path / "metrics.jsonl"))
+    report.append_to_metrics_file(str(tmp_path / "metrics.jsonl"))
+
+    with open(tmp_path / "report.json") as file:
+        written = json.load(file)
+    assert written["stages"]["unzip_archives"]["archives"] == 2
+    assert written["stages"]["unzip_archives"]["queries"] == 0
+    assert [group["logical_group_id"] for group in written["logical_groups"]] == [
+        "1_1",
+        "1_2",
+    ]
+    assert written["totals"] == {
+        "cr3s_queued": 1,
+        "stage_seconds": {"align_records": 0.75},
+        "tables": {"atd_txdot_crashes": {"inserts": 5, "updates": 1}},
+    }
+    # each run is a line of the metrics file
+    with open(tmp_path / "metrics.jsonl") as file:
+        lines = [json.loads(line) for line in file]
+    assert len(lines) == 2
+    assert lines[0]["totals"] == written["totals"]
+
+
+def test_queries_are_timed_by_the_helper_which_sent_them(pg):
+    pg.cursor().execute(
+        """
+        create table atd_txdot_crashes (crash_id integer primary key, case_id varchar);
+        create schema import_test;
+        create table import_test.crash (crash_id integer, case_id varchar);
+        """
+    )
+    instrumentation.take_query_stats()
+
+    util.get_max_crash_id(pg)
+    # reading the catalog is attributed to the helper which needed it
+    util.get_temporary_records(pg, "import_test")
+
+    timings = instrumentation.take_query_stats()["timings"]
+    assert {helper: len(durations) for helper, durations in timings.items()} == {
+        "get_max_crash_id": 1,
+        "get_temporary_records": 2,
+    }
+    summary = instrumentation.summarize_query_timings(timings)
+    assert summary["get_temporary_records"]["queries"] == 2
+    assert (
+        summary["get_temporary_records"]["max_ms"]
+        <= summary["get_temporary_records"]["total_ms"]
+    )
+
+
+def test_slow_queries_are_logged_without_their_values(pg, monkeypatch):
+    monkeypatch.setattr(instrumentation, "slow_query_ms", 0)
+    instrumentation.take_query_stats()
+
+    pg.cursor().execute("select 'SMITH' as prsn_last_name,\n   42 as prsn_age")
+
+    slow_queries = instrumentation.take_query_stats()["slow_queries"]
+    assert [(query["helper"], query["sql"]) for query in slow_queries] == [
+        (
+            "test_slow_queries_are_logged_without_their_values",
+            "select ? as prsn_last_name, ? as prsn_age",
+        )
+    ]
@@ -0,0 +1,40 @@
+from lib.manifest import ImportManifest
+
+
+def write_archive(directory, filename, contents):
+    path = directory / filename
+    path.write_bytes(contents)
+    return str(path)
+
+
+def test_a_resumed_run_skips_what_the_failed_one_finished(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    finished = write_archive(tmp_path, "extract_2023_1.zip", b"finished")
+    interrupted = write_archive(tmp_path, "extract_2023_2.zip", b"interrupted")
+
+    # a run which imported and archived the first archive, and one group of the second before it failed
+    manifest = ImportManifest(manifest_path).load()
+    finished_checksum = manifest.register(finished)
+    interrupted_checksum = manifest.register(interrupted)
+    manifest.mark_group_imported(finished_checksum, "1_1", {1})
+    manifest.mark_imported([finished_checksum])
+    manifest.mark_archived([finished_checksum])
+    manifest.mark_group_imported(interrupted_checksum, "2_1", {2, 3})
+    manifest.save()
+
+    resumed = ImportManifest(manifest_path).load()
+
+    # the finished archive isn't downloaded again, even when it's delivered again under another name
+    assert resumed.finished_filenames() == ["extract_2023_1.zip"]
+    redelivered = write_archive(tmp_path, "extract_2023_1_again.zip", b"finished")
+    assert resumed.is_finished(resumed.register(redelivered))
+    assert resumed.unremoved_filenames() == [
+        "extract_2023_1.zip",
+        "extract_2023_1_again.zip",
+    ]
+
+    # the interrupted archive is imported again, skipping its imported group but not its CR3 invalidations
+    assert not resumed.is_finished(resumed.register(interrupted))
+    assert resumed.is_group_imported(interrupted_checksum, "2_1")
+    assert not resumed.is_group_imported(interrupted_checksum, "2_2")
+    assert resumed.pending_cr3_invalidations() == {2, 3}
@@ -0,0 +1,16 @@
+import pytest
+
+import cris_import
+
+
+def test_the_peak_rss_of_a_table_leaves_out_earlier_tables():
+    # a table which used a lot of memory, and let it go
+    held = bytearray(200 * 1024 * 1024)
+    held[::4096] = b"x" * len(held[::4096])
+    del held
+    earlier_peak = cris_import.peak_rss_mb()
+
+    if not cris_import.reset_peak_rss():
+        pytest.skip("The kernel doesn't let the peak RSS be reset")
+
+    assert cris_import.peak_rss_mb() < earlier_peak - 100
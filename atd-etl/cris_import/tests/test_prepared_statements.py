@@ -0,0 +1,32 @@
+import psycopg2.errors
+import pytest
+
+import lib.sql as util
+from vzdb import fetch
+
+SQL = "select %(crash_id)s + 1 as next_crash_id"
+PARAMETER_TYPES = {"crash_id": "integer"}
+
+
+def test_statements_are_deallocated_when_the_import_fails(pg):
+    with pytest.raises(psycopg2.errors.DivisionByZero):
+        with util.PreparedStatements(pg) as statements:
+            statements.execute(SQL, {"crash_id": 1}, PARAMETER_TYPES)
+            # an error which aborts the transaction the statements were prepared in
+            pg.cursor().execute("select 1 / 0")
+
+    assert fetch(pg, "select name from pg_prepared_statements") == []
+
+    # and the same statement can be prepared again on the connection
+    with util.PreparedStatements(pg) as statements:
+        assert statements.execute(SQL, {"crash_id": 1}, PARAMETER_TYPES).fetchone() == {
+            "next_crash_id": 2
+        }
+
+
+def test_statements_of_two_instances_on_a_connection_are_named_apart(pg):
+    with util.PreparedStatements(pg) as first, util.PreparedStatements(pg) as second:
+        first.execute(SQL, {"crash_id": 1}, PARAMETER_TYPES)
+        second.execute(SQL, {"crash_id": 2}, PARAMETER_TYPES)
+
+        assert len(fetch(pg, "select name from pg_prepared_statements")) == 2
@@ -0,0 +1,56 @@
+import lib.mappings as mappings
+import lib.sql as util
+import cris_import
+from vzdb import IMPORT_SCHEMA, align, create_vzdb, fetch
+
+
+def load_charges(pg, values):
+    # an import table of charges as the loader leaves it, typed as align_db_typing types it
+    cursor = pg.cursor()
+    cursor.execute(
+        f"""
+        create table {IMPORT_SCHEMA}.charges (
+            crash_id varchar, unit_nbr varchar, prsn_nbr varchar, charge_cat_id varchar, charge varchar,
+            citation_nbr varchar
+        );
+        insert into {IMPORT_SCHEMA}.charges values {values};
+        """
+    )
+    columns = util.get_column_types_to_align(
+        pg, IMPORT_SCHEMA, mappings.get_table_map()
+    )["charges"]
+    cursor.execute(
+        util.form_alter_statement_to_apply_table_typing(
+            IMPORT_SCHEMA, {"table_name": "charges"}, columns
+        )
+    )
+    util.invalidate_catalog(IMPORT_SCHEMA)
+    pg.commit()
+
+
+def test_charges_with_a_blank_citation_number_are_replaced(pg):
+    create_vzdb(pg)
+    pg.cursor().execute(
+        """
+        insert into atd_txdot_crashes values (1), (2);
+        insert into atd_txdot_charges (crash_id, unit_nbr, prsn_nbr, charge_cat_id, charge, citation_nbr)
+        values (1, 1, 1, 7, 'SPEEDING', 'A1');
+        """
+    )
+    load_charges(
+        pg,
+        """('1', '1', '1', '1', 'SPEEDING', ''), ('1', '1', '1', '1', 'DWI', 'A2'),
+        ('2', '1', '1', '2', '', '')""",
+    )
+
+    failures, map_state = align(
+        pg, cris_import.align_table_records_replace_by_crash, "charges"
+    )
+
+    # the blank values are stored as the columns' defaults, and neither batch of crashes fails
+    assert failures == []
+    assert map_state["table_outcomes"]["atd_txdot_charges"]["replaced_crashes"] == 2
+    assert fetch(
+        pg,
+        "select crash_id, charge, citation_nbr from atd_txdot_charges order by crash_id, charge",
+    ) == [(1, "DWI", "A2"), (1, "SPEEDING", ""), (2, "", "")]
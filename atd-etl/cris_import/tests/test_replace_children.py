@@ -0,0 +1,77 @@
+import lib.mappings as mappings
+import cris_import
+from vzdb import IMPORT_SCHEMA, align, create_vzdb, fetch
+
+
+def align_children(pg, table):
+    failures, map_state = align(
+        pg,
+        cris_import.align_child_table_records_replace_by_crash,
+        table,
+        replace_children=True,
+    )
+    assert failures == []
+    return map_state["table_outcomes"][mappings.get_table_map()[table]]
+
+
+def test_replacing_people_keeps_their_fatalities(pg):
+    create_vzdb(pg)
+    cursor = pg.cursor()
+    cursor.execute(
+        f"""
+        insert into atd_txdot_crashes values (1), (2);
+        insert into atd_txdot_person
+            (crash_id, unit_nbr, prsn_nbr, prsn_type_id, prsn_occpnt_pos_id, prsn_injry_sev_id, prsn_last_name)
+        values (1, 1, 1, 1, 1, 4, 'SMITH'), (2, 1, 1, 1, 1, 4, 'JONES');
+        -- the VZ team soft-deleted the first fatality
+        update fatalities set is_deleted = true, updated_by = 'vz@austintexas.gov' where crash_id = 1;
+        insert into {IMPORT_SCHEMA}.person values
+            (1, 1, 1, 1, 1, 4, 'SMYTHE'), (1, 1, 2, 1, 1, 1, 'DOE'), (2, 1, 1, 1, 1, 4, 'JONES');
+        """
+    )
+    pg.commit()
+    people = fetch(
+        pg, "select crash_id, prsn_nbr, person_id from atd_txdot_person order by 1, 2"
+    )
+    fatalities = fetch(pg, "select * from fatalities order by id")
+
+    outcomes = align_children(pg, "person")
+
+    # the first crash changed and its person was updated in place, the second didn't change and was left alone
+    assert outcomes["replaced_crashes"] == 1
+    assert outcomes["replaced_updates"] == 1
+    assert outcomes["replaced_inserts"] == 1
+    assert outcomes["replaced_deletes"] == 0
+    people_after = fetch(
+        pg, "select crash_id, prsn_nbr, person_id from atd_txdot_person order by 1, 2"
+    )
+    assert [people_after[0], people_after[2]] == people
+    assert fetch(
+        pg,
+        "select prsn_last_name from atd_txdot_person where crash_id = 1 and prsn_nbr = 1",
+    ) == [("SMYTHE",)]
+    assert fetch(pg, "select * from fatalities order by id") == fatalities
+    assert fetch(pg, "select record_id from atd_txdot_change_log") == [(people[0][2],)]
+
+
+def test_replacing_units_keeps_the_columns_set_on_insert(pg):
+    create_vzdb(pg)
+    cursor = pg.cursor()
+    cursor.execute(
+        f"""
+        insert into atd_txdot_crashes values (1);
+        insert into atd_txdot_units (crash_id, unit_nbr, vin, veh_trvl_dir_id) values (1, 1, 'VIN1', 2);
+        -- the VZ team set the unit's movement and direction of travel, which the insert trigger had defaulted
+        update atd_txdot_units set movement_id = 5, travel_direction = 3;
+        insert into {IMPORT_SCHEMA}.unit values (1, 1, 'VIN1X', 2), (1, 2, 'VIN2', 4);
+        """
+    )
+    pg.commit()
+    unit_id = fetch(pg, "select unit_id from atd_txdot_units")[0][0]
+
+    align_children(pg, "unit")
+
+    assert fetch(
+        pg,
+        "select unit_id, unit_nbr, vin, movement_id, travel_direction from atd_txdot_units order by unit_nbr",
+    ) == [(unit_id, 1, "VIN1X", 5, 3), (unit_id + 1, 2, "VIN2", 0, 4)]
@@ -0,0 +1,50 @@
+import lib.mappings as mappings
+import lib.sql as util
+from vzdb import IMPORT_SCHEMA, create_vzdb, fetch
+
+
+def get_person_plan(pg):
+    output_map = mappings.get_table_map()
+    return util.get_table_plan(
+        pg,
+        output_map,
+        "person",
+        IMPORT_SCHEMA,
+        mappings.get_key_columns()[output_map["person"]],
+        mappings.no_override_columns()[output_map["person"]],
+    )
+
+
+def test_backfilled_hashes_match_the_import_without_firing_triggers(pg):
+    create_vzdb(pg)
+    cursor = pg.cursor()
+    cursor.execute(
+        f"""
+        insert into atd_txdot_crashes values (1);
+        insert into atd_txdot_person
+            (crash_id, unit_nbr, prsn_nbr, prsn_type_id, prsn_occpnt_pos_id, prsn_injry_sev_id, prsn_last_name)
+        values (1, 1, 1, 1, 1, 4, 'SMITH'), (1, 1, 2, 1, 1, 1, 'DOE');
+        insert into {IMPORT_SCHEMA}.person values (1, 1, 1, 1, 1, 4, 'SMITH'), (1, 1, 2, 1, 1, 1, 'DOE');
+        """
+    )
+    pg.commit()
+    plan = get_person_plan(pg)
+
+    # the unchanged records are compared column by column, and aren't written to
+    util.create_record_diff_table(pg, plan.diff_query, "person", IMPORT_SCHEMA)
+    partitions = util.get_record_partition_counts(pg, IMPORT_SCHEMA, "person")
+    assert (partitions["no_ops"], partitions["unchanged_by_hash"]) == (2, 0)
+
+    cursor.execute(
+        util.form_row_hash_backfill_query(
+            mappings.get_table_map(), "person", plan.input_column_names
+        )
+    )
+    assert cursor.fetchone() == (2,)
+    pg.commit()
+
+    util.create_record_diff_table(pg, plan.diff_query, "person", IMPORT_SCHEMA)
+    partitions = util.get_record_partition_counts(pg, IMPORT_SCHEMA, "person")
+    assert (partitions["no_ops"], partitions["unchanged_by_hash"]) == (2, 2)
+    assert fetch(pg, "select count(*) from atd_txdot_change_log") == [(0,)]
+    assert fetch(pg, "select count(*) from fatalities") == [(1,)]
@@ -0,0 +1,65 @@
+import pytest
+
+from lib.s3archive import S3Archiver
+
+
+class FakeS3:
+    """
+    Stands in for an S3 client, keeping what's uploaded to it in memory
+    """
+
+    def __init__(self, failing_filename=None):
+        self.objects = {}
+        self.failing_filename = failing_filename
+
+    def upload_file(self, source, bucket, key, Config=None):
+        if key.endswith("/" + str(self.failing_filename)):
+            raise OSError(f"Couldn't upload {source}")
+        with open(source, "rb") as file:
+            self.objects[(bucket, key)] = file.read()
+
+
+def extract(directory, files):
+    directory.mkdir()
+    for filename, contents in files.items():
+        (directory / filename).write_bytes(contents)
+    return str(directory)
+
+
+def open_archiver(s3):
+    archiver = S3Archiver("key", "secret", "bucket", "cris", workers=2)
+    archiver.s3 = s3
+    return archiver
+
+
+def test_extracted_directories_are_uploaded_in_the_background(tmp_path):
+    s3 = FakeS3()
+
+    with open_archiver(s3) as archiver:
+        archiver.submit(
+            extract(tmp_path / "1", {"crash.csv": b"1,2", "unit.csv": b"3"})
+        )
+        archiver.submit(extract(tmp_path / "2", {"person.csv": b"45"}))
+        upload = archiver.wait()
+
+    assert (upload["files"], upload["bytes"]) == (3, 6)
+    assert sorted(key.split("/")[-1] for _, key in s3.objects) == [
+        "crash.csv",
+        "person.csv",
+        "unit.csv",
+    ]
+    assert all(key.startswith(archiver.destination_path) for _, key in s3.objects)
+
+
+def test_the_first_failed_upload_is_raised(tmp_path):
+    s3 = FakeS3(failing_filename="unit.csv")
+
+    with pytest.raises(OSError, match="unit.csv"):
+        with open_archiver(s3) as archiver:
+            archiver.submit(
+                extract(tmp_path / "1", {"crash.csv": b"1", "unit.csv": b"2"})
+            )
+            archiver.wait()
+
+    # the uploads which could be done were
+    assert [key.split("/")[-1] for _, key in s3.objects] == ["crash.csv"]
@@ -0,0 +1,60 @@
+import pytest
+
+import cris_import
+from vzdb import IMPORT_SCHEMA, align, create_vzdb, fetch
+
+
+def test_a_failing_bulk_update_falls_back_to_updating_record_by_record(pg):
+    create_vzdb(pg)
+    cursor = pg.cursor()
+    cursor.execute(
+        f"""
+        insert into atd_txdot_crashes values (1);
+        insert into atd_txdot_person
+            (crash_id, unit_nbr, prsn_nbr, prsn_type_id, prsn_occpnt_pos_id, prsn_injry_sev_id, prsn_last_name)
+        values (1, 1, 1, 1, 1, 1, 'SMITH'), (1, 1, 2, 1, 1, 1, 'DOE'), (1, 1, 3, 1, 1, 1, 'ROE');
+        alter table atd_txdot_person add constraint no_bad_names check (prsn_last_name <> 'BAD');
+        insert into {IMPORT_SCHEMA}.person values
+            (1, 1, 1, 1, 1, 1, 'SMYTHE'), (1, 1, 2, 1, 1, 1, 'BAD'), (1, 1, 3, 1, 1, 1, 'ROE'), (1, 1, 4, 1, 1, 1, 'BAD');
+        """
+    )
+    pg.commit()
+
+    failures, _ = align(pg, cris_import.align_table_records_set_based, "person")
+
+    # the records which could be written were, and each which couldn't is reported on its own
+    assert fetch(
+        pg, "select prsn_nbr, prsn_last_name from atd_txdot_person order by 1"
+    ) == [(1, "SMYTHE"), (2, "DOE"), (3, "ROE")]
+    assert sorted(failure["key_values"]["prsn_nbr"] for failure in failures) == [2, 4]
+    assert {failure["sqlstate"] for failure in failures} == {"23514"}
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [
+        cris_import.align_table_records_set_based,
+        cris_import.align_table_records_per_record,
+    ],
+)
+def test_changed_cr3_invalidation_counts_changes_to_protected_columns(pg, strategy):
+    create_vzdb(pg)
+    cursor = pg.cursor()
+    cursor.execute(
+        f"""
+        alter table atd_txdot_person add column prsn_age integer;
+        alter table {IMPORT_SCHEMA}.person add column prsn_age integer;
+        insert into atd_txdot_crashes values (1), (2), (3);
+        insert into atd_txdot_person
+            (crash_id, unit_nbr, prsn_nbr, prsn_type_id, prsn_occpnt_pos_id, prsn_injry_sev_id, prsn_last_name, prsn_age)
+        values (1, 1, 1, 1, 1, 1, 'SMITH', 30), (2, 1, 1, 1, 1, 1, 'DOE', 40), (3, 1, 1, 1, 1, 1, 'ROE', 50);
+        insert into {IMPORT_SCHEMA}.person values
+            (1, 1, 1, 1, 1, 1, 'SMITH', 30), (2, 1, 1, 1, 1, 1, 'DOE', 41), (3, 1, 1, 1, 1, 1, 'ROWE', 50);
+        """
+    )
+    pg.commit()
+
+    # crash 1 is unchanged, crash 2 only has a protected column changed, which is left alone, and crash 3 has an
+    # unprotected one changed
+    _, map_state = align(pg, strategy, "person", cr3_invalidation="changed")
+    assert map_state["cr3_invalidations"] == {2, 3}
@@ -0,0 +1,46 @@
+import lib.sql as util
+from vzdb import fetch
+
+
+def insert(pg, crash_id):
+    def run():
+        pg.cursor().execute("insert into crashes values (%s)", (crash_id,))
+
+    return run
+
+
+def test_a_failing_statement_is_rolled_back_on_its_own(pg):
+    pg.cursor().execute("create table crashes (crash_id integer primary key)")
+    pg.commit()
+    batch = util.StatementBatch(pg, batch_size=10)
+
+    assert batch.execute(insert(pg, 1), {"crash_id": 1})
+    assert not batch.execute(insert(pg, 1), {"crash_id": 1})
+    assert batch.execute(insert(pg, 2), {"crash_id": 2})
+    batch.commit()
+
+    # the statements before and after the failure are kept, in one transaction
+    assert fetch(pg, "select crash_id from crashes order by 1") == [(1,), (2,)]
+    assert [
+        (failure["crash_id"], failure["sqlstate"]) for failure in batch.failures
+    ] == [(1, "23505")]
+    assert batch.summary() == {"statements": 2, "commits": 1, "failures": 1}
+
+
+def test_statements_are_committed_a_batch_at_a_time(pg):
+    pg.cursor().execute("create table crashes (crash_id integer primary key)")
+    pg.commit()
+    batch = util.StatementBatch(pg, batch_size=2)
+
+    for crash_id in range(1, 6):
+        batch.execute(insert(pg, crash_id), {"crash_id": crash_id})
+    # the last, partial batch is still open
+    pg.rollback()
+
+    assert fetch(pg, "select crash_id from crashes order by 1") == [
+        (1,),
+        (2,),
+        (3,),
+        (4,),
+    ]
+    assert batch.summary()["commits"] == 2
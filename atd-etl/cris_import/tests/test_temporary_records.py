@@ -0,0 +1,36 @@
+import lib.instrumentation as instrumentation
+import lib.sql as util
+from vzdb import IMPORT_SCHEMA, fetch
+
+
+def test_temporary_records_are_found_and_removed_with_one_query_each(pg):
+    pg.cursor().execute(
+        f"""
+        create table atd_txdot_crashes (crash_id integer primary key, case_id varchar);
+        -- temporary records of two imported crashes, one of them entered twice, and the crashes CRIS delivered
+        insert into atd_txdot_crashes values (5, 'C1'), (6, 'C1'), (7, 'C2'), (8, 'C9'), (100001, 'C1'), (100002, 'C2');
+        create schema {IMPORT_SCHEMA};
+        create table {IMPORT_SCHEMA}.crash (crash_id integer, case_id varchar);
+        insert into {IMPORT_SCHEMA}.crash values (100001, 'C1'), (100002, 'C2'), (100003, 'C3');
+        """
+    )
+    pg.commit()
+    util.get_catalog(pg, IMPORT_SCHEMA)
+    instrumentation.take_query_stats()
+
+    temporary_records = util.get_temporary_records(pg, IMPORT_SCHEMA)
+    removed = util.remove_temporary_records(pg, ["C2"])
+
+    timings = instrumentation.take_query_stats()["timings"]
+    assert len(timings["get_temporary_records"]) == 1
+    assert len(timings["remove_temporary_records"]) == 1
+    assert temporary_records == {"C1": [5, 6], "C2": [7]}
+    # only the temporary records of the case IDs given go, and never a crash CRIS delivered
+    assert removed == [{"crash_id": 7, "case_id": "C2"}]
+    assert fetch(pg, "select crash_id from atd_txdot_crashes order by 1") == [
+        (5,),
+        (6,),
+        (8,),
+        (100001,),
+        (100002,),
+    ]
@@ -0,0 +1,36 @@
+import cris_import
+import lib.instrumentation as instrumentation
+from vzdb import IMPORT_SCHEMA, Database, fetch
+
+
+def test_carriage_returns_are_trimmed_with_one_update_per_table(pg):
+    pg.cursor().execute(
+        f"""
+        create schema {IMPORT_SCHEMA};
+        create table {IMPORT_SCHEMA}.crash (crash_id varchar, rpt_street_name varchar, case_id varchar);
+        create table {IMPORT_SCHEMA}.unit (crash_id varchar, unit_nbr varchar, vin varchar);
+        insert into {IMPORT_SCHEMA}.crash values
+            ('1', E'CONGRESS\\r\\n', E'C1\\r'), ('2', 'LAMAR', 'C2'), ('3', E'GUADALUPE\\n', 'C3');
+        insert into {IMPORT_SCHEMA}.unit values ('1', '1', E'VIN1\\r\\n'), ('2', '1', 'VIN2');
+        """
+    )
+    pg.commit()
+    instrumentation.take_query_stats()
+
+    map_state = cris_import.remove_trailing_carriage_returns(
+        {"import_schema": IMPORT_SCHEMA}, Database(pg)
+    )
+
+    # only the rows which had any were rewritten, every column of a table at once
+    assert map_state["stages"]["remove_trailing_carriage_returns"]["rows"] == 3
+    timings = instrumentation.take_query_stats()["timings"]
+    assert len(timings["trim_trailing_carriage_returns"]) == 2
+    assert fetch(pg, f"select * from {IMPORT_SCHEMA}.crash order by crash_id") == [
+        ("1", "CONGRESS", "C1"),
+        ("2", "LAMAR", "C2"),
+        ("3", "GUADALUPE", "C3"),
+    ]
+    assert fetch(pg, f"select vin from {IMPORT_SCHEMA}.unit order by crash_id") == [
+        ("VIN1",),
+        ("VIN2",),
+    ]
@@ -0,0 +1,53 @@
+import cris_import
+import lib.instrumentation as instrumentation
+from vzdb import Database, create_vzdb, fetch
+
+# an import schema of its own, with its tables as the loader leaves them
+LOADED_SCHEMA = "import_loaded"
+
+
+def test_each_table_is_typed_with_a_single_alter(pg):
+    create_vzdb(pg)
+    pg.cursor().execute(
+        f"""
+        create schema {LOADED_SCHEMA};
+        create table {LOADED_SCHEMA}.person (
+            crash_id varchar, unit_nbr varchar, prsn_nbr varchar, prsn_type_id varchar, prsn_occpnt_pos_id varchar,
+            prsn_injry_sev_id varchar, prsn_last_name varchar
+        );
+        create table {LOADED_SCHEMA}.unit (crash_id varchar, unit_nbr varchar, vin varchar, veh_trvl_dir_id varchar);
+        insert into {LOADED_SCHEMA}.person values ('1', '1', '1', '1', '1', '', 'SMITH');
+        insert into {LOADED_SCHEMA}.unit values ('1', '1', '', '2');
+        """
+    )
+    pg.commit()
+    instrumentation.take_query_stats()
+
+    cris_import.align_db_typing({"import_schema": LOADED_SCHEMA}, Database(pg))
+
+    # the ALTERs are the only queries align_db_typing sends itself
+    timings = instrumentation.take_query_stats()["timings"]
+    assert len(timings["align_db_typing"]) == 2
+    assert (
+        fetch(
+            pg,
+            f"""
+        select table_name, column_name, data_type from information_schema.columns
+        where table_schema = '{LOADED_SCHEMA}' and column_name in ('prsn_injry_sev_id', 'prsn_last_name', 'unit_nbr')
+        order by 1, 2
+        """,
+        )
+        == [
+            ("person", "prsn_injry_sev_id", "integer"),
+            ("person", "prsn_last_name", "character varying"),
+            ("person", "unit_nbr", "integer"),
+            ("unit", "unit_nbr", "integer"),
+        ]
+    )
+    # blank values are typed as nulls
+    assert fetch(
+        pg, f"select prsn_injry_sev_id, prsn_last_name from {LOADED_SCHEMA}.person"
+    ) == [(None, "SMITH")]
+    assert fetch(pg, f"select vin, veh_trvl_dir_id from {LOADED_SCHEMA}.unit") == [
+        (None, 2)
+    ]
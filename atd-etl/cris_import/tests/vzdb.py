@@ -0,0 +1,163 @@
+"""
+A throwaway copy of the parts of the VZDB the import writes to, with the triggers which act on its records
+"""
+
+import glob
+import os
+import re
+from contextlib import contextmanager
+
+import lib.mappings as mappings
+import lib.sql as util
+
+MIGRATIONS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "../../../atd-vzd/migrations/default",
+)
+
+IMPORT_SCHEMA = "import_test"
+
+# The VZDB functions the import relies on, and the triggers which act on the records it writes, as they're defined
+# by the migrations
+FUNCTIONS = [
+    "fatality_insert",
+    "update_fatality_soft_delete",
+    "atd_txdot_units_create",
+    "atd_txdot_units_create_update",
+    "atd_txdot_person_updates_audit_log",
+    "atd_txdot_units_updates_audit_log",
+    "cris_row_hash_reset",
+    "cris_row_hash_backfill",
+]
+TRIGGERS = [
+    "atd_txdot_person_fatal_insert",
+    "atd_txdot_person_update_injry",
+    "atd_txdot_person_audit_log",
+    "atd_txdot_person_cris_row_hash_reset",
+    "atd_txdot_units_create",
+    "atd_txdot_units_create_update",
+    "atd_txdot_units_audit_log",
+    "atd_txdot_units_cris_row_hash_reset",
+]
+
+# Just enough of the VZDB tables for the triggers, with the constraints the fatalities depend on
+VZDB_TABLES = """
+create table atd_txdot_crashes (crash_id integer primary key);
+create table atd_txdot_person (
+    person_id serial primary key, crash_id integer, unit_nbr integer, prsn_nbr integer, prsn_type_id integer,
+    prsn_occpnt_pos_id integer, prsn_injry_sev_id integer, prsn_last_name varchar, cris_row_hash text
+);
+create table atd_txdot_primaryperson (primaryperson_id serial primary key, crash_id integer);
+create table atd_txdot_units (
+    unit_id serial primary key, crash_id integer, unit_nbr integer, vin varchar, veh_trvl_dir_id integer,
+    travel_direction integer, movement_id integer, unit_desc_id integer, veh_body_styl_id integer,
+    atd_mode_category integer, cris_row_hash text, unique (crash_id, unit_nbr)
+);
+create table fatalities (
+    id serial primary key,
+    crash_id integer not null references atd_txdot_crashes (crash_id) on update cascade on delete cascade,
+    person_id integer unique references atd_txdot_person (person_id) on update cascade on delete cascade,
+    primaryperson_id integer unique
+        references atd_txdot_primaryperson (primaryperson_id) on update cascade on delete cascade,
+    is_deleted boolean default false not null,
+    updated_by text
+);
+create table atd_txdot_charges (
+    charge_id serial primary key, crash_id integer default 0 not null, unit_nbr integer default 0 not null,
+    prsn_nbr integer default 0 not null, charge_cat_id integer default 0 not null, charge text default '' not null,
+    citation_nbr character varying(32) default '' not null
+);
+create table atd_txdot_change_log (
+    change_log_id serial primary key, record_id integer, record_crash_id integer, record_type text, record_json json
+);
+create table atd_txdot_changes (record_id integer, record_type text, status_id integer);
+"""
+
+
+def read_migrations():
+    paths = sorted(glob.glob(os.path.join(MIGRATIONS, "*/up.sql")))
+    return [open(path).read() for path in paths]
+
+
+def find_function(migrations, name):
+    # the definition from the latest migration which has one
+    pattern = re.compile(
+        rf"CREATE (?:OR REPLACE )?FUNCTION public\.{name}\(.*?AS (\$\w*\$).*?\1;",
+        re.DOTALL,
+    )
+    definitions = [
+        match.group(0) for sql in migrations for match in pattern.finditer(sql)
+    ]
+    assert definitions, f"No definition of {name} in the migrations"
+    return definitions[-1]
+
+
+def find_trigger(migrations, name):
+    pattern = re.compile(rf"CREATE TRIGGER {name}\s.*?;", re.DOTALL)
+    definitions = [
+        match.group(0) for sql in migrations for match in pattern.finditer(sql)
+    ]
+    assert definitions, f"No trigger {name} in the migrations"
+    return definitions[-1]
+
+
+def create_vzdb(pg):
+    # the VZDB tables and their triggers, and an import schema with tables as align_db_typing leaves them
+    migrations = read_migrations()
+    cursor = pg.cursor()
+    cursor.execute(VZDB_TABLES)
+    for name in FUNCTIONS:
+        cursor.execute(find_function(migrations, name))
+    for name in TRIGGERS:
+        cursor.execute(find_trigger(migrations, name))
+    cursor.execute(f"create schema {IMPORT_SCHEMA}")
+    cursor.execute(
+        f"""
+        create table {IMPORT_SCHEMA}.person (
+            crash_id integer, unit_nbr integer, prsn_nbr integer, prsn_type_id integer, prsn_occpnt_pos_id integer,
+            prsn_injry_sev_id integer, prsn_last_name varchar
+        );
+        create table {IMPORT_SCHEMA}.unit (crash_id integer, unit_nbr integer, vin varchar, veh_trvl_dir_id integer);
+        """
+    )
+    pg.commit()
+
+
+def fetch(pg, sql):
+    cursor = pg.cursor()
+    cursor.execute(sql)
+    return cursor.fetchall()
+
+
+class Database:
+    """
+    Stands in for the DatabaseConnectionManager of a run, handing out the test's connection to the stages
+    """
+
+    def __init__(self, pg):
+        self.pg = pg
+
+    @contextmanager
+    def connection(self):
+        yield self.pg
+
+
+def align(pg, strategy, table, **settings):
+    # reconcile an import table with one of the import's strategies, returning the failed statements and the map state
+    map_state = {
+        "import_schema": IMPORT_SCHEMA,
+        "dry_run": False,
+        "replace_children": False,
+        "cr3_invalidation": "matched",
+        "cr3_invalidations": set(),
+        "table_outcomes": {},
+        "batch_size": 10,
+        "itersize": 100,
+        **settings,
+    }
+    batch = util.StatementBatch(pg, map_state["batch_size"])
+    util.identify_as_cris_import(pg)
+    with util.PreparedStatements(pg) as statements:
+        strategy(pg, statements, batch, map_state, mappings.get_table_map(), table)
+        batch.commit()
+    return batch.failures, map_state
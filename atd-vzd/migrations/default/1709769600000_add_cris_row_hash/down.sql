@@ -0,0 +1,12 @@
+DROP TRIGGER IF EXISTS atd_txdot_crashes_cris_row_hash_reset ON public.atd_txdot_crashes;
+DROP TRIGGER IF EXISTS atd_txdot_units_cris_row_hash_reset ON public.atd_txdot_units;
+DROP TRIGGER IF EXISTS atd_txdot_person_cris_row_hash_reset ON public.atd_txdot_person;
+DROP TRIGGER IF EXISTS atd_txdot_primaryperson_cris_row_hash_reset ON public.atd_txdot_primaryperson;
+
+DROP FUNCTION IF EXISTS public.cris_row_hash_reset();
+DROP FUNCTION IF EXISTS public.cris_row_hash_backfill(regclass, text[]);
+
+ALTER TABLE public.atd_txdot_crashes DROP COLUMN cris_row_hash;
+ALTER TABLE public.atd_txdot_units DROP COLUMN cris_row_hash;
+ALTER TABLE public.atd_txdot_person DROP COLUMN cris_row_hash;
+ALTER TABLE public.atd_txdot_primaryperson DROP COLUMN cris_row_hash;
@@ -0,0 +1,73 @@
+-- The CRIS import stores a hash of the CRIS data each record was last written with, so that
+-- unchanged records in later extracts can be recognized without comparing every column
+alter table "public"."atd_txdot_crashes" add column "cris_row_hash" text
+ null;
+alter table "public"."atd_txdot_units" add column "cris_row_hash" text
+ null;
+alter table "public"."atd_txdot_person" add column "cris_row_hash" text
+ null;
+alter table "public"."atd_txdot_primaryperson" add column "cris_row_hash" text
+ null;
+
+-- Any change which does not come from the CRIS import may have changed the CRIS data of the
+-- record, so the stored hash no longer describes it and is cleared
+CREATE OR REPLACE FUNCTION public.cris_row_hash_reset()
+ RETURNS trigger
+ LANGUAGE plpgsql
+AS $function$
+BEGIN
+    IF NEW.cris_row_hash IS NOT DISTINCT FROM OLD.cris_row_hash
+        AND coalesce(current_setting('vz.cris_import', true), '') <> 'true' THEN
+        NEW.cris_row_hash := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$function$;
+
+CREATE TRIGGER atd_txdot_crashes_cris_row_hash_reset
+BEFORE UPDATE ON public.atd_txdot_crashes
+FOR EACH ROW
+EXECUTE FUNCTION public.cris_row_hash_reset();
+
+CREATE TRIGGER atd_txdot_units_cris_row_hash_reset
+BEFORE UPDATE ON public.atd_txdot_units
+FOR EACH ROW
+EXECUTE FUNCTION public.cris_row_hash_reset();
+
+CREATE TRIGGER atd_txdot_person_cris_row_hash_reset
+BEFORE UPDATE ON public.atd_txdot_person
+FOR EACH ROW
+EXECUTE FUNCTION public.cris_row_hash_reset();
+
+CREATE TRIGGER atd_txdot_primaryperson_cris_row_hash_reset
+BEFORE UPDATE ON public.atd_txdot_primaryperson
+FOR EACH ROW
+EXECUTE FUNCTION public.cris_row_hash_reset();
+
+COMMENT ON FUNCTION public.cris_row_hash_reset() IS 'Clears the cris_row_hash of a record updated by anything other than the CRIS import.';
+
+-- The import only stores the hash along with a change, so records which are already up to date get theirs from this
+-- backfill, once for each table. The hash is over the columns a CRIS extract provides, in name order, as the import
+-- computes it, and the import prints the call to make, with the columns of its extract, when it finds unchanged
+-- records without a hash. The table's triggers are disabled while the hashes are stored: the records' data don't
+-- change, so there's nothing to audit or recompute, and the hashes mustn't be cleared.
+CREATE OR REPLACE FUNCTION public.cris_row_hash_backfill(target regclass, columns text[])
+ RETURNS bigint
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+    backfilled bigint;
+BEGIN
+    EXECUTE format('ALTER TABLE %s DISABLE TRIGGER USER', target);
+    EXECUTE format(
+        'UPDATE %s SET cris_row_hash = md5(row(%s)::text) WHERE cris_row_hash IS NULL',
+        target,
+        (SELECT string_agg(quote_ident(name), ', ' ORDER BY name COLLATE "C") FROM unnest(columns) AS name)
+    );
+    GET DIAGNOSTICS backfilled = ROW_COUNT;
+    EXECUTE format('ALTER TABLE %s ENABLE TRIGGER USER', target);
+    RETURN backfilled;
+END;
+$function$;
+
+COMMENT ON FUNCTION public.cris_row_hash_backfill(regclass, text[]) IS 'Stores the cris_row_hash of the records of a table which have none, hashing the given CRIS columns, without firing triggers.';